@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from telegram import ChatMember, Update
+from telegram.ext import ContextTypes
+
+from metrics import CACHE_HIT_RATIO
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = (ChatMember.ADMINISTRATOR, ChatMember.OWNER)
+
+
+class AdminCache:
+    """Per-chat cache of administrator ids and the owner id.
+
+    Entries expire after ``ttl`` seconds and are dropped as soon as a
+    chat_member update reports a promotion or demotion in that chat.
+    Concurrent misses for one chat share a single get_chat_administrators call;
+    a call that was already in flight when the chat was invalidated is not
+    cached, since its list may predate the change.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, FrozenSet[int], Optional[int]]] = {}
+        self._in_flight: Dict[int, asyncio.Task] = {}
+        # Лічильник інвалідацій чату: результат запиту, під час якого він змінився, не кешується
+        self._generations: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def _get(self, bot, chat_id: int) -> Tuple[float, FrozenSet[int], Optional[int]]:
+        entry = self._entries.get(chat_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry
+
+        task = self._in_flight.get(chat_id)
+        if task is None:
+            self.misses += 1
+            task = self._in_flight[chat_id] = asyncio.create_task(self._load(bot, chat_id))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, bot, chat_id: int) -> Tuple[float, FrozenSet[int], Optional[int]]:
+        generation = self._generations.get(chat_id, 0)
+        try:
+            administrators = await bot.get_chat_administrators(chat_id)
+            owner_id = next((admin.user.id for admin in administrators if admin.status == ChatMember.OWNER), None)
+            entry = (time.monotonic() + self.ttl, frozenset(admin.user.id for admin in administrators), owner_id)
+            if self._generations.get(chat_id, 0) == generation:
+                self._entries[chat_id] = entry
+            return entry
+        finally:
+            # Після інвалідації тут може бути вже новий запит
+            if self._in_flight.get(chat_id) is asyncio.current_task():
+                del self._in_flight[chat_id]
+
+    async def is_admin(self, bot, chat_id: int, user_id: int) -> bool:
+        _, admin_ids, _ = await self._get(bot, chat_id)
+        return user_id in admin_ids
+
+    async def owner_id(self, bot, chat_id: int) -> Optional[int]:
+        _, _, owner_id = await self._get(bot, chat_id)
+        return owner_id
+
+    def invalidate(self, chat_id: int):
+        self._generations[chat_id] = self._generations.get(chat_id, 0) + 1
+        # Нові перевірки не повинні чекати на запит, що почався до зміни
+        self._in_flight.pop(chat_id, None)
+        if self._entries.pop(chat_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'chats': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'invalidations': self.invalidations,
+            'hit_ratio': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+admin_cache = AdminCache(ttl=float(os.getenv('ADMIN_CACHE_TTL', '600')))
+CACHE_HIT_RATIO.set_function(lambda: admin_cache.stats()['hit_ratio'], cache='admins')
+
+
+async def track_admin_changes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    member_update = update.chat_member or update.my_chat_member
+    old_status = member_update.old_chat_member.status
+    new_status = member_update.new_chat_member.status
+    # Будь-яка зміна, що стосується адміністраторів (підвищення, пониження, зміна прав)
+    if old_status in ADMIN_STATUSES or new_status in ADMIN_STATUSES:
+        admin_cache.invalidate(member_update.chat.id)
+        logger.info(f"Admin list of chat {member_update.chat.id} changed ({old_status} -> {new_status})")
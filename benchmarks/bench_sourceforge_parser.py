@@ -0,0 +1,46 @@
+"""Compare the streaming SourceForge listing parser with the BeautifulSoup one.
+
+Runs both parsers over the saved listing pages in fixtures/sourceforge and
+prints the time per page. Usage:
+
+    python benchmarks/bench_sourceforge_parser.py [--rows N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sourceforge import LISTING_ROWS, iter_files_list, parse_files_list_soup  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'sourceforge')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=LISTING_ROWS, help='rows the streaming parser reads')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<24}{'bytes':>8}{'soup ms':>10}{'stream ms':>11}{'speedup':>9}")
+    for fixture in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            content = f.read()
+
+        soup_files = parse_files_list_soup(content)
+        stream_files = list(islice(iter_files_list(content), args.rows))
+        # Обидва парсери мають повертати однакові записи
+        for expected, actual in zip(soup_files, stream_files):
+            assert vars(expected) == vars(actual), (fixture, vars(expected), vars(actual))
+
+        soup_time = min(timeit.repeat(lambda: parse_files_list_soup(content), number=1, repeat=args.repeat))
+        stream_time = min(timeit.repeat(lambda: list(islice(iter_files_list(content), args.rows)),
+                                        number=1, repeat=args.repeat))
+        print(f"{fixture:<24}{len(content):>8}{soup_time * 1000:>10.3f}{stream_time * 1000:>11.3f}"
+              f"{soup_time / stream_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
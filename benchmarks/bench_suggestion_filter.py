@@ -0,0 +1,80 @@
+"""Messages per second through delete_non_suggestion_messages.
+
+Feeds prebuilt fake updates straight into the handler, without Telegram.
+Usage:
+
+    python benchmarks/bench_suggestion_filter.py [--messages N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_messages import delete_non_suggestion_messages, suggestion_filter  # noqa: E402
+from moderation import TokenBucket, moderation_queue  # noqa: E402
+
+CHAT_ID = -1001234567890
+TOPIC_ID = 42
+
+
+class FakeBot:
+    def __init__(self):
+        self.deleted = 0
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.deleted += len(message_ids)
+        return True
+
+
+def make_update(chat_id, thread_id, text):
+    message = SimpleNamespace(chat_id=chat_id, message_thread_id=thread_id, message_id=1, text=text)
+    return SimpleNamespace(effective_message=message)
+
+
+SCENARIOS = {
+    'unconfigured chat': make_update(-100555, None, 'hello everyone'),
+    'other thread': make_update(CHAT_ID, 7, 'just chatting'),
+    'suggestion kept': make_update(CHAT_ID, TOPIC_ID, 'please add dark mode #suggestion'),
+    'suggestion deleted': make_update(CHAT_ID, TOPIC_ID, 'is there an update for onclite?'),
+}
+
+
+async def run(messages: int):
+    suggestion_filter.update_channel({
+        'channel_id': str(CHAT_ID),
+        'topic_suggestion': str(TOPIC_ID),
+        'suggestion_tags': ['#suggestion', '#idea'],
+        'suggestion_patterns': [r'(?i)\bfeature request\b'],
+    })
+    # Без правила сценарії з темою пропозицій вимірювали б лише ранній вихід
+    if (CHAT_ID, TOPIC_ID) not in suggestion_filter.rules:
+        raise SystemExit("Suggestion filter rule was not installed, see the log above")
+    bot = FakeBot()
+    context = SimpleNamespace(bot=bot)
+    # Вимірюється обробник, а не ліміт Bot API: без обмеження черга видалень спорожняється одразу
+    moderation_queue.limiter = TokenBucket(rate=1e9, capacity=1e9)
+
+    for name, update in SCENARIOS.items():
+        started = time.perf_counter()
+        for _ in range(messages):
+            await delete_non_suggestion_messages(update, context)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<20}{messages / elapsed:>14,.0f} msg/s{elapsed / messages * 1e6:>10.2f} us/msg")
+
+    await moderation_queue.close()
+    print(f"\n{bot.deleted:,} messages deleted in {moderation_queue.calls:,} deleteMessages calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Offline stand-in for the Bot API, plugged into ``telegram.Bot`` as its request object.
+
+Every API method is answered locally with a canned result, so an Application
+can be initialised and run handlers without a token or network access.
+"""
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {'id': 1000000001, 'is_bot': True, 'first_name': 'CraftRomBot', 'username': 'craftrom_bot'}
+OWNER = {'id': 1000000002, 'is_bot': False, 'first_name': 'Owner', 'username': 'owner'}
+
+
+class FakeRequest(BaseRequest):
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._message_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    def _result(self, method: str, params: dict):
+        if method == 'getMe':
+            return BOT_USER
+        if method in ('sendMessage', 'editMessageText'):
+            self._message_id += 1
+            return {
+                'message_id': self._message_id,
+                'date': int(time.time()),
+                'chat': {'id': int(params.get('chat_id', 0)), 'type': 'supergroup', 'title': 'Bench'},
+                'from': BOT_USER,
+                'text': params.get('text', ''),
+            }
+        if method == 'getChatAdministrators':
+            return [{'status': 'creator', 'user': OWNER, 'is_anonymous': False}]
+        if method == 'getChatMember':
+            return {'status': 'member', 'user': {'id': int(params['user_id']), 'is_bot': False,
+                                                 'first_name': 'Member'}}
+        if method == 'getUpdates':
+            return []
+        return True
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        self.calls[api_method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = request_data.parameters if request_data is not None else {}
+        return 200, json.dumps({'ok': True, 'result': self._result(api_method, params)}).encode()
@@ -0,0 +1,40 @@
+"""Offline stand-in for GitHub and SourceForge, plugged into ``http_client.transport``.
+
+devices.json and SourceForge listing pages are served from benchmarks/fixtures,
+so the catalogue, /rom and the release watcher work without network access.
+"""
+import asyncio
+import os
+import re
+from collections import Counter
+from typing import Optional
+
+import httpx
+
+from catalog import DEVICES_URL
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SOURCEFORGE_PATH_RE = re.compile(r'^/projects/craftrom/files/([^/]+)/([^/]+)/$')
+
+
+def upstream_transport(latency: float = 0.0, calls: Optional[Counter] = None) -> httpx.MockTransport:
+    """Answer devices.json and listing pages from fixtures, counting requests per host in ``calls``."""
+    with open(os.path.join(FIXTURES_DIR, 'devices.json'), 'rb') as f:
+        devices = f.read()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if calls is not None:
+            calls[request.url.host] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if str(request.url) == DEVICES_URL:
+            return httpx.Response(200, content=devices, headers={'ETag': '"fixture"'})
+        match = SOURCEFORGE_PATH_RE.match(request.url.path)
+        if request.url.host == 'sourceforge.net' and match:
+            path = os.path.join(FIXTURES_DIR, 'sourceforge', f"{match.group(1)}_{match.group(2)}.html")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return httpx.Response(200, content=f.read())
+        return httpx.Response(404)
+
+    return httpx.MockTransport(handler)
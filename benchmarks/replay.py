@@ -0,0 +1,320 @@
+"""Replay recorded update streams through the bot without network access.
+
+Updates from fixtures/updates.jsonl go through the real Application, update
+processor and handlers. The Bot API is the in-process FakeRequest, and GitHub
+and SourceForge are answered from fixtures/ by an httpx MockTransport. Both
+can be given artificial latency. Reports throughput, end-to-end latency per
+update (including block=False handlers), latency per handler and peak
+allocations per update, and writes JSON tagged with the git commit so runs
+can be compared across commits:
+
+    python benchmarks/replay.py --repeat 20 --rate 500 --output before.json
+    python benchmarks/replay.py --repeat 20 --rate 500 --compare before.json
+"""
+import argparse
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, ROOT)
+
+# Стан бота (канали, стан релізів) живе в тимчасовому каталозі, а не в робочій копії
+WORKDIR = tempfile.mkdtemp(prefix='craftrom-replay-')
+shutil.copy(os.path.join(FIXTURES_DIR, 'channels.json'), os.path.join(WORKDIR, 'channels.json'))
+os.environ.update(
+    CHANNELS_BACKEND='json',
+    CHANNELS_FILE=os.path.join(WORKDIR, 'channels.json'),
+    RELEASE_STATE_FILE=os.path.join(WORKDIR, 'release_state.json'),
+    METRICS_PORT='0',
+)
+
+from telegram import Update  # noqa: E402
+from telegram.ext import ApplicationBuilder  # noqa: E402
+
+from benchmarks.fake_telegram import FakeRequest  # noqa: E402
+from benchmarks.fake_upstream import upstream_transport  # noqa: E402
+from http_client import http_client  # noqa: E402
+from moderation import moderation_queue  # noqa: E402
+
+# Задачі block=False-обробників, створені під час обробки поточного оновлення
+_spawned: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar('spawned', default=None)
+
+
+def load_stream(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def git_commit() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': dirty}
+
+
+class Harness:
+    def __init__(self, telegram_latency: float, upstream_latency: float):
+        self.upstream_calls = Counter()
+        self.handler_latencies: Dict[str, List[float]] = {}
+        self.telegram = FakeRequest(latency=telegram_latency)
+        http_client.transport = upstream_transport(upstream_latency, self.upstream_calls)
+
+        from bot_start import build_application
+        builder = (
+            ApplicationBuilder()
+            .token('123456:FAKE')
+            .request(self.telegram)
+            .get_updates_request(FakeRequest())
+            .updater(None)
+        )
+        self.app = build_application(builder)
+        for handlers in self.app.handlers.values():
+            for handler in handlers:
+                handler.callback = self._timed(handler.callback)
+
+        original_create_task = self.app.create_task
+
+        def create_task(coroutine, update=None, **kwargs):
+            task = original_create_task(coroutine, update=update, **kwargs)
+            spawned = _spawned.get()
+            if spawned is not None:
+                spawned.append(task)
+            return task
+
+        self.app.create_task = create_task
+
+    def _timed(self, callback):
+        latencies = self.handler_latencies.setdefault(callback.__name__, [])
+
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        return wrapper
+
+    async def start(self):
+        from watcher import watch_releases
+
+        await self.app.initialize()
+        await self.app.post_init(self.app)
+        await self.app.start()
+        # Періодичні задачі заважають вимірюванню: один прогін вручну, далі без них
+        for job in self.app.job_queue.jobs():
+            job.schedule_removal()
+        await watch_releases(SimpleNamespace(bot=self.app.bot))
+
+    async def stop(self):
+        await self.app.stop()
+        await self.app.post_stop(self.app)
+        await self.app.shutdown()
+        await self.app.post_shutdown(self.app)
+
+    async def dispatch(self, update: Update) -> None:
+        spawned = []
+        token = _spawned.set(spawned)
+        try:
+            coroutine = self.app.process_update(update)
+            await self.app.update_processor.process_update(update, coroutine)
+        finally:
+            _spawned.reset(token)
+        if spawned:
+            await asyncio.gather(*spawned, return_exceptions=True)
+
+    def updates(self, stream: List[Dict[str, Any]], repeat: int):
+        update_id = 0
+        for _ in range(repeat):
+            for data in stream:
+                update_id += 1
+                yield Update.de_json(dict(data, update_id=update_id), self.app.bot)
+
+    async def replay(self, stream: List[Dict[str, Any]], repeat: int, rate: float) -> Dict[str, Any]:
+        latencies = []
+
+        async def timed_dispatch(update, due):
+            await self.dispatch(update)
+            latencies.append(time.perf_counter() - due)
+
+        tasks = []
+        started = time.perf_counter()
+        for index, update in enumerate(self.updates(stream, repeat)):
+            due = started + index / rate if rate else time.perf_counter()
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Затримка рахується від запланованого моменту, а не від фактичного відправлення
+            tasks.append(asyncio.create_task(timed_dispatch(update, due)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        return {
+            'updates': len(latencies),
+            'elapsed_s': elapsed,
+            'throughput': len(latencies) / elapsed,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.50) * 1000,
+                'p99': percentile(latencies, 0.99) * 1000,
+                'max': max(latencies) * 1000,
+            },
+        }
+
+    async def allocations(self, stream: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """One sequential pass under tracemalloc: peak bytes allocated while handling each update."""
+        updates = list(self.updates(stream, 1))
+        peaks = []
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            for update in updates:
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                await self.dispatch(update)
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            retained = tracemalloc.get_traced_memory()[0] - baseline
+        finally:
+            tracemalloc.stop()
+        return {
+            'peak_bytes_p50': percentile(peaks, 0.50),
+            'peak_bytes_p99': percentile(peaks, 0.99),
+            'retained_bytes_per_update': retained / len(updates),
+        }
+
+    def handler_summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                'count': len(latencies),
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+            }
+            for name, latencies in sorted(self.handler_latencies.items()) if latencies
+        }
+
+
+async def run(args) -> Dict[str, Any]:
+    stream = load_stream(args.stream)
+    harness = Harness(args.telegram_latency, args.upstream_latency)
+    await harness.start()
+    try:
+        if args.warmup:
+            await harness.replay(stream, 1, 0)
+            await moderation_queue.close()
+        for latencies in harness.handler_latencies.values():
+            latencies.clear()
+        telegram_before = Counter(harness.telegram.calls)
+        upstream_before = Counter(harness.upstream_calls)
+
+        result = await harness.replay(stream, args.repeat, args.rate)
+        # Видалення збираються у фоні з затримкою; без цього deleteMessages не потрапили б у звіт
+        await moderation_queue.close()
+        result['handlers'] = harness.handler_summary()
+        result['telegram_calls'] = dict(harness.telegram.calls - telegram_before)
+        result['upstream_calls'] = dict(harness.upstream_calls - upstream_before)
+        if not args.no_alloc:
+            result['allocations'] = await harness.allocations(stream)
+    finally:
+        await harness.stop()
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    return {
+        **git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'params': {
+            'stream': os.path.relpath(args.stream, ROOT),
+            'repeat': args.repeat,
+            'rate': args.rate,
+            'telegram_latency': args.telegram_latency,
+            'upstream_latency': args.upstream_latency,
+        },
+        'result': result,
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    result = report['result']
+
+    def line(label, value, base_value=None, unit=''):
+        text = f"{label:<28}{value:>12,.2f} {unit}"
+        if base_value:
+            text += f"   ({(value - base_value) / base_value:+.1%} vs {baseline['commit'][:8]})"
+        print(text)
+
+    def base(*path):
+        value = baseline['result'] if baseline else None
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+
+    print(f"commit {(report['commit'] or 'unknown')[:8]}{' (dirty)' if report['dirty'] else ''}, "
+          f"{result['updates']} updates")
+    if baseline and baseline['params'] != report['params']:
+        print(f"warning: baseline was run with different parameters: {baseline['params']}")
+    line('throughput', result['throughput'], base('throughput'), 'updates/s')
+    line('latency p50', result['latency_ms']['p50'], base('latency_ms', 'p50'), 'ms')
+    line('latency p99', result['latency_ms']['p99'], base('latency_ms', 'p99'), 'ms')
+    if 'allocations' in result:
+        line('peak alloc/update p50', result['allocations']['peak_bytes_p50'],
+             base('allocations', 'peak_bytes_p50'), 'B')
+        line('peak alloc/update p99', result['allocations']['peak_bytes_p99'],
+             base('allocations', 'peak_bytes_p99'), 'B')
+    print(f"\n{'handler':<32}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in result['handlers'].items():
+        print(f"{name:<32}{stats['count']:>8}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+    print(f"\nBot API calls: {result['telegram_calls']}")
+    print(f"Upstream calls: {result['upstream_calls'] or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stream', default=os.path.join(FIXTURES_DIR, 'updates.jsonl'),
+                        help='JSON lines file with one Telegram update per line')
+    parser.add_argument('--repeat', type=int, default=10, help='how many times to replay the stream')
+    parser.add_argument('--rate', type=float, default=0, help='updates per second (0: as fast as possible)')
+    parser.add_argument('--telegram-latency', type=float, default=0.0, help='seconds per Bot API call')
+    parser.add_argument('--upstream-latency', type=float, default=0.0, help='seconds per GitHub/SourceForge call')
+    parser.add_argument('--no-warmup', dest='warmup', action='store_false')
+    parser.add_argument('--no-alloc', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='JSON report of an earlier run to compare with')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Measure how long a restarted bot takes to import, start and answer its first update.
+
+Each run is a fresh interpreter that goes through the same steps as
+``bot_start.py`` in polling mode: it imports the bot, sets up logging,
+builds and starts the Application and begins polling. The Bot API is the
+in-process FakeRequest, and the first getUpdates returns a single /start
+message. The run ends when the reply is sent. Reports the time of each phase
+and the slowest imports:
+
+    python benchmarks/startup.py --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Відлік від першого рядка дочірнього процесу; час до нього (запуск інтерпретатора) рахує батьківський
+STARTED = time.perf_counter()
+STARTED_WALL = time.time()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+FIRST_UPDATE = {
+    'update_id': 700000001,
+    'message': {
+        'message_id': 1,
+        'date': 1727500001,
+        'chat': {'id': 2000000031, 'type': 'private', 'first_name': 'User31'},
+        'from': {'id': 2000000031, 'is_bot': False, 'first_name': 'User31'},
+        'text': '/start',
+        'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+    },
+}
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+async def _child(timings):
+    import asyncio
+
+    from telegram import Update
+    from telegram.ext import ApplicationBuilder
+
+    from benchmarks.fake_telegram import FakeRequest
+
+    class FirstUpdateRequest(FakeRequest):
+        """Hands out FIRST_UPDATE on the first getUpdates and reports the first sent message."""
+
+        def __init__(self):
+            super().__init__()
+            self.delivered = False
+            self.replied = asyncio.Event()
+
+        def _result(self, method: str, params: dict):
+            if method == 'getUpdates' and not self.delivered:
+                self.delivered = True
+                return [FIRST_UPDATE]
+            if method == 'sendMessage':
+                self.replied.set()
+            return super()._result(method, params)
+
+    import bot_start
+    from logging_setup import setup_logging, shutdown_logging
+    timings['import'] = time.perf_counter() - STARTED
+
+    setup_logging()
+    request = FirstUpdateRequest()
+    application = bot_start.build_application(
+        ApplicationBuilder().token('123456:FAKE').request(request).get_updates_request(request))
+    timings['build'] = time.perf_counter() - STARTED
+
+    # Той самий порядок, що й у Application.run_polling
+    await application.initialize()
+    await application.post_init(application)
+    await application.updater.start_polling(poll_interval=0, allowed_updates=Update.ALL_TYPES)
+    await application.start()
+    timings['ready'] = time.perf_counter() - STARTED
+
+    await asyncio.wait_for(request.replied.wait(), 30)
+    timings['first_update'] = time.perf_counter() - STARTED
+
+    await application.updater.stop()
+    await application.stop()
+    await application.post_stop(application)
+    await application.shutdown()
+    await application.post_shutdown(application)
+    shutdown_logging()
+
+
+def child():
+    import asyncio
+
+    sys.path.insert(0, ROOT)
+    timings = {}
+    asyncio.run(_child(timings))
+    # Різні процеси порівнюються за системним годинником
+    timings['started_at'] = STARTED_WALL
+    print(json.dumps(timings), flush=True)
+
+
+def child_env(workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update(
+        CHANNELS_BACKEND='json',
+        CHANNELS_FILE=os.path.join(workdir, 'channels.json'),
+        RELEASE_STATE_FILE=os.path.join(workdir, 'release_state.json'),
+        LOG_FILE=os.path.join(workdir, 'bot.log'),
+        METRICS_PORT='0',
+    )
+    env.pop('SHARED_CACHE_DB', None)
+    return env
+
+
+def run_once(workdir: str) -> dict:
+    shutil.copy(os.path.join(FIXTURES_DIR, 'channels.json'), os.path.join(workdir, 'channels.json'))
+    spawned_at = time.time()
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=workdir,
+                               env=child_env(workdir), capture_output=True, text=True, check=True)
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    interpreter = timings.pop('started_at') - spawned_at
+    return {'interpreter': interpreter, **{phase: interpreter + elapsed for phase, elapsed in timings.items()}}
+
+
+def slowest_imports(workdir: str, limit: int) -> list:
+    """Top-level bot modules and their dependencies ranked by cumulative import time."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import bot_start'], cwd=ROOT,
+                               env=child_env(workdir), capture_output=True, text=True, check=True)
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        # Лише модулі, імпортовані напряму з bot_start або з модулів бота (відступ до двох рівнів)
+        if match and len(match.group(3)) <= 4:
+            imports.append((match.group(4), int(match.group(2)) / 1000))
+    imports.sort(key=lambda item: item[1], reverse=True)
+    return [{'module': name, 'cumulative_ms': ms} for name, ms in imports[:limit]]
+
+
+def git_commit() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit}
+
+
+def median(values: list) -> float:
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='number of cold starts')
+    parser.add_argument('--imports', type=int, default=10, help='how many of the slowest imports to show')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    workdir = tempfile.mkdtemp(prefix='craftrom-startup-')
+    try:
+        runs = [run_once(workdir) for _ in range(args.runs)]
+        imports = slowest_imports(workdir, args.imports)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    phases = {phase: {'median_ms': median([run[phase] for run in runs]) * 1000,
+                      'min_ms': min(run[phase] for run in runs) * 1000}
+              for phase in runs[0]}
+    print(f"{'phase (since spawn)':<28}{'median ms':>12}{'min ms':>10}")
+    for phase, stats in phases.items():
+        print(f"{phase:<28}{stats['median_ms']:>12.1f}{stats['min_ms']:>10.1f}")
+    print(f"\n{'slowest imports':<40}{'ms':>10}")
+    for entry in imports:
+        print(f"{entry['module']:<40}{entry['cumulative_ms']:>10.1f}")
+
+    if args.output:
+        report = {
+            **git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'runs': args.runs,
+            'phases': phases,
+            'imports': imports,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Load generator for the webhook endpoint.
+
+POSTs synthetic text-message updates and reports accepted updates per second,
+request latency and the end-to-end rate until the bot's queue is drained.
+With --serve it starts the bot in-process against the fake Bot API first, so
+no token or Telegram access is needed (client and bot then share one event
+loop, so the numbers are a lower bound):
+
+    python benchmarks/webhook_loadgen.py --serve --updates 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook import SECRET_HEADER  # noqa: E402
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'supergroup', 'title': f'Chat {chat_id}'},
+            'from': {'id': 2000000000 + update_id % 500, 'is_bot': False, 'first_name': 'User'},
+            'text': 'does anyone have the latest build for onclite?',
+        },
+    }
+
+
+async def start_local_bot(args):
+    from telegram.ext import ApplicationBuilder
+
+    # Стан релізів не потрапляє в робочу копію; змінна читається під час імпорту watcher
+    os.environ.setdefault('RELEASE_STATE_FILE', os.path.join(tempfile.mkdtemp(prefix='craftrom-loadgen-'),
+                                                             'release_state.json'))
+
+    from benchmarks.fake_telegram import FakeRequest
+    from benchmarks.fake_upstream import upstream_transport
+    from bot_start import build_application
+    from http_client import http_client
+    from webhook import WebhookConfig, run_webhook
+
+    # Задачі з post_init (перевірка релізів) ходять у GitHub/SourceForge; тут їм відповідають фікстури
+    http_client.transport = upstream_transport()
+
+    config = WebhookConfig()
+    config.url = None
+    config.listen, config.port, config.path = '127.0.0.1', args.port, '/telegram'
+    config.secret_token = args.secret
+    config.queue_size = args.queue_size
+    builder = (
+        ApplicationBuilder()
+        .token('123456:FAKE')
+        .request(FakeRequest())
+        .get_updates_request(FakeRequest())
+        .updater(None)
+    )
+    stop_event = asyncio.Event()
+    application = build_application(builder, queue_size=config.queue_size)
+    task = asyncio.create_task(run_webhook(application, config, stop_event))
+    # Чекаємо, поки сервер почне слухати порт
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(f'http://127.0.0.1:{args.port}/healthz')
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    return stop_event, task
+
+
+async def run(args):
+    if args.serve:
+        stop_event, bot_task = await start_local_bot(args)
+        args.url = f'http://127.0.0.1:{args.port}/telegram'
+
+    headers = {SECRET_HEADER: args.secret} if args.secret else {}
+    health_url = args.url.rsplit('/', 1)[0] + '/healthz'
+    update_ids = itertools.count(1)
+    statuses = Counter()
+    latencies = []
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def worker():
+            while True:
+                update_id = next(update_ids)
+                if update_id > args.updates:
+                    return
+                payload = make_update(update_id, -1001000000000 - update_id % args.chats)
+                started = time.perf_counter()
+                response = await client.post(args.url, json=payload, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        sent_elapsed = time.perf_counter() - started
+
+        # Кінець вимірювання — коли черга бота спорожніла
+        while (await client.get(health_url)).json()['queue']:
+            await asyncio.sleep(0.01)
+        total_elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"updates:        {args.updates} ({dict(statuses)})")
+    print(f"accepted rate:  {statuses[200] / sent_elapsed:,.0f} updates/s")
+    print(f"end-to-end:     {statuses[200] / total_elapsed:,.0f} updates/s")
+    print(f"latency p50:    {statistics.median(latencies) * 1000:.2f} ms")
+    print(f"latency p99:    {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms")
+
+    if args.serve:
+        stop_event.set()
+        await bot_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8443/telegram')
+    parser.add_argument('--secret', default=os.getenv('WEBHOOK_SECRET'))
+    parser.add_argument('--updates', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--chats', type=int, default=100)
+    parser.add_argument('--serve', action='store_true', help='run the bot in-process against a fake Bot API')
+    parser.add_argument('--port', type=int, default=18443)
+    parser.add_argument('--queue-size', type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,26 @@
+import asyncio
 import logging
 import os
 import random
-
-from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
-
-from commands import start, devices, rom, system_info, clean, set_topic, init
-from filter_messages import delete_non_suggestion_messages
-
-# Налаштування логування
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, ChatMemberHandler, CommandHandler, InlineQueryHandler, MessageHandler, \
+    filters
+
+from admins import track_admin_changes
+from catalog import devices_cache
+from channels import channel_registry
+from http_client import TelegramRequest, http_client
+from inline import inline_rom
+from logging_setup import setup_logging, shutdown_logging
+from metrics import METRICS_PORT, QUEUE_DEPTH, loop_lag_monitor, metrics_server
+from scheduler import ChatOrderedUpdateProcessor, instrument_handlers, limit_non_blocking_handlers
+from watcher import RELEASE_WATCH_INTERVAL, warm_rom_pages, watch_releases
+from webhook import WebhookConfig, run_webhook
+from moderation import moderation_queue, remember_member
+from commands import start, devices, rom, system_info, clean, set_topic, init, announce
+from filter_messages import delete_non_suggestion_messages, suggestion_filter
 
 logger = logging.getLogger(__name__)
 
@@ -39,33 +48,127 @@ async def mention_handler(update, context):
     if bot_username in update.message.text:
         # Відповідь на повідомлення, що бота тегнули
         response = get_random_response()
-        update.message.reply_text(response)
+        await update.message.reply_text(response)
     elif update.message.reply_to_message and update.message.reply_to_message.from_user.username == bot_username:
         # Відповідь на повідомлення, що бота тегнули
         response = get_random_response()
-        update.message.reply_text(response)
+        await update.message.reply_text(response)
 
 
 mention_trigger = MessageHandler(filters.TEXT & ~filters.COMMAND, mention_handler)
 
 
-def main():
-    application = ApplicationBuilder().token(os.getenv('TELEGRAM_TOKEN')).build()
+async def post_init(application):
+    # Спільний HTTP-клієнт живе стільки ж, скільки й Application
+    await http_client.start()
+    channel_registry.add_listener(suggestion_filter.update_channel)
+    channel_registry.load()
+    loop_lag_monitor.start()
+    QUEUE_DEPTH.set_function(application.update_queue.qsize, queue='updates')
+    if METRICS_PORT:
+        await metrics_server.start()
+    # Релізи перевіряються у фоні, а не на кожен /rom; це ж прогріває сторінки /rom
+    if application.job_queue is None:
+        logger.warning("JobQueue is not available, release watcher is disabled")
+    elif os.getenv('WORKER_INDEX', '0') == '0':
+        application.job_queue.run_repeating(watch_releases, interval=RELEASE_WATCH_INTERVAL, first=1,
+                                            name='watch_releases')
+    else:
+        # Інші робочі процеси беруть лістинги зі спільного кешу, який наповнює процес 0
+        application.job_queue.run_repeating(warm_rom_pages, interval=RELEASE_WATCH_INTERVAL, first=5,
+                                            name='warm_rom_pages')
+
+
+async def post_stop(application):
+    # Бот ще ініціалізований: відкладені видалення встигають піти в Bot API до shutdown()
+    await moderation_queue.close()
+
+
+async def post_shutdown(application):
+    await metrics_server.stop()
+    await loop_lag_monitor.stop()
+    await channel_registry.close()
+    await devices_cache.close()
+    await http_client.stop()
+
+
+def default_builder() -> ApplicationBuilder:
+    # Запити до Bot API (крім getUpdates) потрапляють у метрики HTTP
+    return ApplicationBuilder().token(os.getenv('TELEGRAM_TOKEN')).request(TelegramRequest(connection_pool_size=256))
+
+
+def build_application(builder: Optional[ApplicationBuilder] = None, queue_size: Optional[int] = None):
+    builder = builder or default_builder()
+    # Обмежена черга: у режимі polling Updater перестає забирати оновлення, коли вона повна
+    if queue_size is None:
+        queue_size = int(os.getenv('UPDATE_QUEUE_SIZE', '1000'))
+    # Оновлення різних чатів обробляються паралельно, в межах чату/теми — по черзі
+    update_processor = ChatOrderedUpdateProcessor(
+        workers=int(os.getenv('UPDATE_WORKERS', '8')),
+        max_pending=int(os.getenv('UPDATE_MAX_PENDING', '1024')),
+    )
+    application = (
+        builder
+        .concurrent_updates(update_processor)
+        # Черга видає оновлення лише коли є вільний слот, інакше вони лишаються в ній
+        .update_queue(update_processor.update_queue(queue_size))
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Додавання обробників команд
+    # block=False: довгі команди не затримують наступні оновлення свого чату
     application.add_handler(CommandHandler('start', start))
     application.add_handler(CommandHandler('devices', devices))
-    application.add_handler(CommandHandler('rom', rom))
+    application.add_handler(CommandHandler('rom', rom, block=False))
     # Додати обробник команди /sysinfo
-    application.add_handler(CommandHandler('sysinfo', system_info))
-    application.add_handler(CommandHandler('clean', clean))
+    application.add_handler(CommandHandler('sysinfo', system_info, block=False))
+    application.add_handler(CommandHandler('clean', clean, block=False))
+    # Автодоповнення пристроїв в inline-режимі (@bot onc...)
+    application.add_handler(InlineQueryHandler(inline_rom))
     application.add_handler(mention_trigger)
     application.add_handler(CommandHandler("set_topic", set_topic))
     application.add_handler(CommandHandler("init", init))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, delete_non_suggestion_messages))
+    application.add_handler(CommandHandler("announce", announce))
+    # Скидання кешу адміністраторів при підвищенні/пониженні учасників
+    application.add_handler(ChatMemberHandler(track_admin_changes, ChatMemberHandler.ANY_CHAT_MEMBER))
+    # Окрема група: інакше mention_trigger з тим самим фільтром перехоплює всі повідомлення
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, delete_non_suggestion_messages), group=1)
+    # Запам'ятовуємо учасників груп для /clean (Bot API не віддає список учасників)
+    application.add_handler(MessageHandler(filters.ChatType.GROUPS, remember_member), group=2)
 
+    instrument_handlers(application)
+    limit_non_blocking_handlers(application)
+    return application
+
+
+def main():
+    setup_logging()
+    try:
+        run()
+    finally:
+        shutdown_logging()
+
+
+def run():
+    if os.getenv('BOT_MODE', 'polling') == 'supervisor':
+        from supervisor import run_supervisor
+        asyncio.run(run_supervisor())
+        return
+
+    if os.getenv('BOT_MODE', 'polling') == 'webhook':
+        config = WebhookConfig()
+        # Обмежена черга: коли бот не встигає, вебхук відповідає 503 замість накопичення
+        builder = default_builder().updater(None)
+        asyncio.run(run_webhook(build_application(builder, queue_size=config.queue_size), config))
+        return
+
+    application = build_application()
     # Запуск бота
-    application.run_polling()
+    # chat_member оновлення Telegram надсилає лише на явний запит
+    application.run_polling(allowed_updates=Update.ALL_TYPES)
     logger.info("Bot started polling...")
 
 
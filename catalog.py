@@ -0,0 +1,233 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from http_client import http_client
+from metrics import CACHE_HIT_RATIO
+from shared_cache import remaining_ttl, shared_cache
+
+logger = logging.getLogger(__name__)
+
+DEVICES_URL = 'https://raw.githubusercontent.com/craftrom-os/official_devices/master/devices.json'
+
+
+def get_supported_devices(devices_data: List[Dict[str, Any]]) -> List[str]:
+    supported_devices = []
+    for device in devices_data:
+        name = device['name']
+        variant_names = device.get('variant_name', [])
+        variant_names_str = ", ".join(variant_names) if variant_names else device['codename']
+        non_deprecated_versions = [
+            version for version in device.get('supported_versions', [])
+            if not version.get('deprecated')
+        ]
+        if non_deprecated_versions:
+            supported_devices.append(f" - {name} ({variant_names_str})")
+    return supported_devices
+
+
+class DeviceCatalog:
+    """Indexed view of devices.json, built once per catalogue refresh.
+
+    Every codename and variant name maps to its device through a case-insensitive
+    dict; unknown codes fall back to an unambiguous prefix match. The /devices and
+    /rom code-list messages are rendered up front.
+    """
+
+    def __init__(self, devices: List[Dict[str, Any]], revision: int = 0):
+        self.devices = devices
+        self.revision = revision
+        self._index: Dict[str, Dict[str, Any]] = {}
+        for device in devices:
+            for key in (device['codename'], *device.get('variant_name', [])):
+                self._index.setdefault(key.lower(), device)
+        self._keys = sorted(self._index)
+
+        supported_devices = get_supported_devices(devices)
+        self.devices_message = (
+            "<b>Supported devices releases:</b>\n" +
+            "\n".join(supported_devices) +
+            "\n\nTo get the latest release type /rom (codename), for example: /rom onclite"
+        ) if supported_devices else None
+        self.codes_message = (
+            '<b>Please specify the device code.</b>\n'
+            'Example: <code>/rom onclite</code>\n'
+            'You can also use <code>/rom</code> to get a list of supported devices.\n\n'
+            '<b>List of supported device codes:</b>\n' + ", ".join(device['codename'] for device in devices)
+        ) if devices else None
+
+    def __len__(self):
+        return len(self.devices)
+
+    def get(self, device_code: str) -> Optional[Dict[str, Any]]:
+        key = device_code.lower()
+        device = self._index.get(key)
+        if device is None:
+            matches = self.complete(key)
+            # Префікс має однозначно вказувати на один пристрій
+            if len(matches) == 1:
+                device = matches[0]
+        return device
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Devices with a codename or variant starting with ``prefix``, in key order."""
+        prefix = prefix.lower()
+        matches = []
+        seen = set()
+        position = bisect.bisect_left(self._keys, prefix)
+        while position < len(self._keys) and self._keys[position].startswith(prefix):
+            device = self._index[self._keys[position]]
+            if id(device) not in seen:
+                seen.add(id(device))
+                matches.append(device)
+                if limit is not None and len(matches) >= limit:
+                    break
+            position += 1
+        return matches
+
+
+class CatalogCache:
+    """In-process cache for devices.json with TTL and stale-while-revalidate.
+
+    Fresh data is served from memory. Once the TTL expires the stale copy is
+    still returned immediately while a single background refresh revalidates it
+    with ETag/If-Modified-Since. On network errors the last good copy is kept.
+    With a shared cache (several worker processes) a copy fetched by another
+    process is reused before going to the network.
+    """
+
+    def __init__(self, url: str, ttl: float, error_ttl: float = 60.0):
+        self.url = url
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._data: Optional[DeviceCatalog] = None
+        self._expires_at = 0.0
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._fetched_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.not_modified = 0
+        self.errors = 0
+
+    async def get(self) -> Optional[DeviceCatalog]:
+        """Return the catalogue, or None if it has never been fetched successfully."""
+        if self._data is None:
+            self.misses += 1
+            await self._refresh()
+            return self._data
+
+        if time.monotonic() >= self._expires_at:
+            self.stale_hits += 1
+            self._start_refresh()
+        else:
+            self.hits += 1
+        return self._data
+
+    def peek(self) -> Optional[DeviceCatalog]:
+        """Return the cached catalogue without waiting; a stale or missing one is refreshed in the background."""
+        if self._data is None or time.monotonic() >= self._expires_at:
+            self._start_refresh()
+        return self._data
+
+    def _start_refresh(self) -> asyncio.Task:
+        # Одночасно виконується не більше одного оновлення
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._fetch())
+        return self._refresh_task
+
+    async def _refresh(self):
+        await asyncio.shield(self._start_refresh())
+
+    def _set_data(self, devices: List[Dict[str, Any]], etag: Optional[str], last_modified: Optional[str],
+                  fetched_at: float, ttl: float):
+        self._data = DeviceCatalog(devices, revision=self.refreshes + 1)
+        self._etag = etag
+        self._last_modified = last_modified
+        self._fetched_at = fetched_at
+        self._expires_at = time.monotonic() + ttl
+        self.refreshes += 1
+        logger.info(f"Devices catalogue refreshed ({len(devices)} devices), cache stats: {self.stats()}")
+
+    async def _share(self):
+        await shared_cache.aput(self.url, {
+            'devices': self._data.devices,
+            'etag': self._etag,
+            'last_modified': self._last_modified,
+            'fetched_at': self._fetched_at,
+        }, self.ttl)
+
+    async def _fetch(self):
+        if shared_cache is not None:
+            entry = await shared_cache.aget(self.url)
+            if entry is not None:
+                value, expires_at = entry
+                if value['fetched_at'] != self._fetched_at:
+                    self._set_data(value['devices'], value['etag'], value['last_modified'], value['fetched_at'],
+                                   remaining_ttl(expires_at))
+                else:
+                    self._expires_at = time.monotonic() + remaining_ttl(expires_at)
+                return
+
+        headers = {}
+        if self._data is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+
+        try:
+            response = await http_client.get(self.url, headers=headers)
+            if response.status_code == 304 and self._data is not None:
+                self.not_modified += 1
+                self._expires_at = time.monotonic() + self.ttl
+                if shared_cache is not None:
+                    await self._share()
+                return
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self.errors += 1
+            # Залишаємо останню вдалу копію і пробуємо ще раз трохи пізніше
+            self._expires_at = time.monotonic() + min(self.error_ttl, self.ttl)
+            logger.error(f"Error fetching devices data: {e}")
+            return
+
+        self._set_data(data, response.headers.get('ETag'), response.headers.get('Last-Modified'), time.time(),
+                       self.ttl)
+        if shared_cache is not None:
+            await self._share()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+            'hit_ratio': (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+    async def close(self):
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+
+devices_cache = CatalogCache(DEVICES_URL, ttl=float(os.getenv('DEVICES_CACHE_TTL', '3600')))
+
+CACHE_HIT_RATIO.set_function(lambda: devices_cache.stats()['hit_ratio'], cache='devices')
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from storage import ChannelStore, create_channel_store
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelRegistry:
+    """In-memory channel configuration indexed by ``channel_id``.
+
+    The store is read once at startup. Changes are applied to memory first and
+    handed to the store by a debounced background task, so bursts of updates
+    cost a single write.
+    """
+
+    def __init__(self, store: ChannelStore, save_delay: float = 1.0):
+        self.store = store
+        self.save_delay = save_delay
+        self._channels: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._dirty: Set[str] = set()
+        self._flush_now = asyncio.Event()
+        self._save_task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call ``callback(channel)`` for every loaded, added or updated channel."""
+        self._listeners.append(callback)
+
+    def _notify(self, channel: Dict[str, Any]):
+        for callback in self._listeners:
+            callback(channel)
+
+    def load(self):
+        self._channels = {channel['channel_id']: channel for channel in self.store.load_all()}
+        for channel in self._channels.values():
+            self._notify(channel)
+        logger.info(f"Loaded {len(self._channels)} channels from {type(self.store).__name__}")
+
+    async def reload(self):
+        """Pick up channels changed in the store by other worker processes.
+
+        Our own pending changes are written first, and channels changed
+        meanwhile keep their in-memory version.
+        """
+        await self.flush()
+        async with self._lock:
+            channels = await asyncio.to_thread(self.store.load_all)
+        for channel in channels:
+            if channel['channel_id'] in self._dirty:
+                continue
+            self._channels[channel['channel_id']] = channel
+            self._notify(channel)
+
+    def __contains__(self, chat_id) -> bool:
+        return str(chat_id) in self._channels
+
+    def get(self, chat_id) -> Optional[Dict[str, Any]]:
+        return self._channels.get(str(chat_id))
+
+    def all(self) -> List[Dict[str, Any]]:
+        return list(self._channels.values())
+
+    def add(self, channel: Dict[str, Any]):
+        self._channels[channel['channel_id']] = channel
+        self._notify(channel)
+        self._mark_dirty(channel['channel_id'])
+
+    def update(self, chat_id, **fields):
+        channel = self._channels[str(chat_id)]
+        channel.update(fields)
+        self._notify(channel)
+        self._mark_dirty(str(chat_id))
+
+    def _mark_dirty(self, channel_id: str):
+        self._dirty.add(channel_id)
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_later())
+
+    async def _save_later(self):
+        # Зміни, що надійшли під час запису, підхоплюються наступною ітерацією
+        while self._dirty:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.save_delay)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+            if self._flush_now.is_set():
+                return
+
+    async def flush(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            changed = [dict(self._channels[channel_id]) for channel_id in dirty]
+            snapshot = [dict(channel) for channel in self._channels.values()]
+            try:
+                await asyncio.to_thread(self.store.save, changed, snapshot)
+            except (OSError, sqlite3.Error) as e:
+                self._dirty |= dirty
+                logger.error(f"Error saving channels: {e}")
+
+    async def close(self):
+        # Не скасовуємо задачу посеред запису, а просимо її записати негайно
+        self._flush_now.set()
+        if self._save_task is not None:
+            await self._save_task
+            self._save_task = None
+        await self.flush()
+        self.store.close()
+
+
+channel_registry = ChannelRegistry(create_channel_store())
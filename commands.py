@@ -1,20 +1,41 @@
+import functools
 import logging
-import platform
+import re
 import time
+from typing import Tuple
 
-import psutil
-import requests
 from telegram import Update
 from telegram.ext import CallbackContext, ContextTypes
-from utils import is_user_admin, extract_files_list, load_channels, save_channels, \
-    find_owner_id, is_chat_initialized, fetch_devices_data, get_supported_devices, get_device_by_code, send_error_message, send_message
+from admins import admin_cache
+from catalog import devices_cache
+from channels import channel_registry
+from filter_messages import FilterRule
+from metrics import HANDLER_ERRORS, LOOP_LAG, http_summary
+from moderation import find_deleted_accounts, moderation_queue
+from scheduler import queue_depth, slowest_handlers
+from responses import START_MESSAGE, rom_pages
+from sourceforge import listing_cache
+from utils import is_user_admin, \
+    find_owner_id, is_chat_initialized, fetch_device_catalog, send_error_message, send_message
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def bot_version() -> str:
+    # Файл version змінюється лише під час деплою, тож читаємо його один раз на процес
+    try:
+        with open('version', 'r') as version_file:
+            return version_file.read().strip()
+    except FileNotFoundError:
+        return "Unknown"
+
+
+@functools.lru_cache(maxsize=None)
+def os_info() -> Tuple[str, str, str]:
+    import platform
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='bot.log'  # Файл, в который будут записываться логи
-)
+    return platform.system(), platform.version(), platform.release()
 
 
 async def init(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -26,8 +47,6 @@ async def init(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text('The /init command cannot be used in private chats.')
         return
 
-    channels = load_channels()
-
     if await is_chat_initialized(chat_id):
         await update.message.reply_text('This channel has already been initialized.')
         return
@@ -37,14 +56,12 @@ async def init(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text('Could not determine the owner of the chat.')
         return
 
-    channels.append({
+    channel_registry.add({
         "channel_id": str(chat_id),
         "owner_id": str(owner_id),
         "channel_title": chat_title
     })
 
-    save_channels(channels)
-
     await update.message.reply_text('Channel successfully initialized!')
 
 
@@ -64,149 +81,105 @@ async def set_topic(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     message_thread_id = update.message.message_thread_id  # Get the value of message_thread_id
 
+    # Optional filter: /set_topic #idea #suggestion /regex/
+    # With only /regex/ given the default #suggestion tag no longer applies; each regex may use (?i) etc.
+    tags = [arg for arg in context.args if arg.startswith('#')]
+    patterns = [arg[1:-1] for arg in context.args if len(arg) > 2 and arg.startswith('/') and arg.endswith('/')]
+    if len(tags) + len(patterns) != len(context.args):
+        await update.message.reply_text("Please specify hashtags (#tag) or regular expressions (/regex/).")
+        return
     try:
-        # Load the channels list
-        channels = load_channels()
+        FilterRule(tags, patterns)
+    except re.error as e:
+        await update.message.reply_text(f"Invalid regular expression: {e}")
+        return
 
-        # Find the chat in the channels list by chat_id
-        for channel in channels:
-            if channel['channel_id'] == str(chat_id):
-                # Check if topic_suggestion already exists and is equal to message_thread_id
-                if 'topic_suggestion' in channel and channel['topic_suggestion'] == str(message_thread_id):
-                    await update.message.reply_text("The topic suggestion ID is already set to this value.")
-                    return
+    channel = channel_registry.get(chat_id)
+    # Check if topic_suggestion already exists and is equal to message_thread_id
+    if not context.args and channel.get('topic_suggestion') == str(message_thread_id):
+        await update.message.reply_text("The topic suggestion ID is already set to this value.")
+        return
+
+    fields = {'topic_suggestion': str(message_thread_id)}
+    if context.args:
+        fields.update(suggestion_tags=tags, suggestion_patterns=patterns)
+    # Зміна застосовується в пам'яті, запис у файл відбувається у фоні
+    channel_registry.update(chat_id, **fields)
+
+    await update.message.reply_text(f"Topic suggestion ID set: {message_thread_id}")
+
+
+# Підписка чату (теми) на оголошення про нові збірки
+async def announce(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    chat_id = update.effective_chat.id
+    if not await is_chat_initialized(chat_id):
+        await update.message.reply_text('This channel is not initialized.')
+        return
 
-                # Add the "topic_suggestion" field with the value of message_thread_id
-                channel['topic_suggestion'] = str(message_thread_id)
-                break
+    if not await is_user_admin(update, context, user.id, chat_id):
+        await update.message.reply_text("You do not have permission to execute this command.")
+        return
 
-        # Save the updated channels list
-        save_channels(channels)
+    if len(context.args) != 1 or context.args[0].lower() not in ('on', 'off'):
+        await update.message.reply_text("Usage: /announce on|off")
+        return
 
-        await update.message.reply_text(f"Topic suggestion ID set: {message_thread_id}")
-    except (IndexError, ValueError):
-        await update.message.reply_text("Please specify a valid topic ID.")
+    if context.args[0].lower() == 'on':
+        message_thread_id = update.message.message_thread_id
+        channel_registry.update(chat_id, announce_releases=True, announce_topic=str(message_thread_id))
+        await update.message.reply_text("New builds will be announced in this topic.")
+    else:
+        channel_registry.update(chat_id, announce_releases=False)
+        await update.message.reply_text("Release announcements are turned off.")
 
 
 async def start(update: Update, context: CallbackContext) -> None:
-    await update.message.reply_text(
-        '<b>Welcome! This is your bot, ready to assist you.</b>\n\n'
-        '<b>Description:</b>\n'
-        'This bot provides information about supported devices for CRAFT ROM, including the latest available versions and download links.\n\n'
-        '<b>Available Commands:</b>\n'
-        '<code>/start</code> - Display this welcome message and list of commands.\n'
-        '<code>/rom [device_code]</code> - Get information about the specified device code.\n'
-        '<code>/rom</code> - Get a list of all supported device codes.\n'
-        'Example: <code>/rom onclite</code>',
-        parse_mode='HTML'
-    )
-    logging.info("User requested /start command.")
+    await update.message.reply_text(START_MESSAGE, parse_mode='HTML')
+    logger.info("User requested /start command.")
 
-import requests
-import logging
 
 async def devices(update: Update, context: CallbackContext) -> None:
-    devices_data = await fetch_devices_data()
-    if devices_data is None:
+    catalog = await fetch_device_catalog()
+    if catalog is None:
         await send_error_message(update, "Unable to fetch devices data.")
         return
 
-    if not devices_data:
+    if not catalog:
         await send_message(update, "Device code list is empty or not found.")
         return
 
-    supported_devices = get_supported_devices(devices_data)
-    if not supported_devices:
+    if catalog.devices_message is None:
         await send_message(update, "No supported devices with non-deprecated releases found.")
         return
 
-    supported_devices_str = "\n".join(supported_devices)
-    message = (
-        "<b>Supported devices releases:</b>\n" +
-        supported_devices_str +
-        "\n\nTo get the latest release type /rom (codename), for example: /rom onclite"
-    )
-    await send_message(update, message)
+    await send_message(update, catalog.devices_message)
 
 async def rom(update: Update, context: CallbackContext) -> None:
     device_code = context.args[0] if context.args else None
-    devices_data = await fetch_devices_data()
-    if devices_data is None:
+    catalog = await fetch_device_catalog()
+    if catalog is None:
         await send_error_message(update, "Unable to fetch devices data.")
         return
 
     if not device_code:
-        if not devices_data:
+        if not catalog:
             await send_message(update, "Device code list is empty or not found.")
         else:
-            device_codes = [device['codename'] for device in devices_data]
-            device_codes_str = ", ".join(device_codes)
-            await send_message(
-                update,
-                '<b>Please specify the device code.</b>\n'
-                'Example: <code>/rom onclite</code>\n'
-                'You can also use <code>/rom</code> to get a list of supported devices.\n\n'
-                '<b>List of supported device codes:</b>\n' + device_codes_str,
-            )
+            await send_message(update, catalog.codes_message)
         return
 
-    device = get_device_by_code(devices_data, device_code)
+    device = catalog.get(device_code)
     if not device:
         await send_message(update, f"<b>Device code {device_code} not found.</b>")
-        logging.warning(f"Device code {device_code} not found.")
+        logger.warning(f"Device code {device_code} not found.")
         return
 
-    name = device.get('name')
-    brand = device.get('brand')
-    variant_names = device.get('variant_name', [])
-    variant_names_str = ", ".join(variant_names)
-    maintainers = device.get('maintainers', 'No maintainers')
-    supported_versions = device.get('supported_versions', [])
-    latest_versions = supported_versions[-2:] if len(supported_versions) >= 2 else supported_versions
-
-    versions_text_list = []
-    for version in latest_versions:
-        version_code = version.get('version_code')
-        sf_url = f"https://sourceforge.net/projects/craftrom/files/{device_code}/{version_code}/"
-        version_code = version_code.replace("thrall", "thrall (Android 13)").replace("uther", "uther (Android 14)")
-        stable = version.get('stable')
-        deprecated = version.get('deprecated')
-        version_status = "Stable" if stable else "Unstable"
-        if deprecated:
-            version_status += " (Deprecated)"
-
-        try:
-            files_list = extract_files_list(sf_url)
-            if files_list:
-                file_info = files_list[0]
-                versions_text_list.append(
-                    f'▪️<b>Version:</b> {version_code}\n'
-                    f' • <i>Date:</i> {file_info.last_updated}\n'
-                    f' • <i>Status:</i> {version_status}\n'
-                    f' • <i>Download:</i> <a href="{file_info.download_link}">{file_info.name}</a> ({file_info.size})'
-                )
-            else:
-                versions_text_list.append(f'▪️<b>Version:</b> {version_code} (Not available)')
-        except requests.RequestException as e:
-            versions_text_list.append(f'▪️<b>Version:</b> {version_code} (Error checking availability)')
-            logging.error(f"Error checking availability for version {version_code}: {e}")
-
-    versions_text = "\n".join(versions_text_list)
-    message = (
-        f"#{device_code} #rom\n"
-        f"<b>{brand} | {name}</b>\n\n"
-        f'Device information: <a href="https://craft-rom.pp.ua/devices/{device_code}/">here</a>\n\n'
-        f"▪️<b>Device codename:</b> {device_code}\n"
-        f"▪️<b>Variant names:</b> {variant_names_str}\n"
-        f"▪️<b>Maintainer:</b> {maintainers}\n"
-        f"{versions_text}\n\n\n"
-        f"<i>Discuss device's, feature's, or just chat about everything.</i>\n"
-        f'<a href="https://discord.gg/vErZGrSyqD">DISCORD CRAFTROM</a> | '
-        f'<a href="http://t.me/craftrom">CHAT CRAFTROM</a> | '
-        f'<a href="http://t.me/craftrom_news">NEWS</a>'
-    )
+    device_code = device['codename']
+    # Сторінка рендериться заново лише після зміни каталогу або нового релізу
+    message = await rom_pages.get(catalog, device)
     await send_message(update, message)
-    logging.info(f"Device info sent for device code {device_code}.")
+    logger.info(f"Device info sent for device code {device_code}.")
 async def system_info(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
     chat_id = update.effective_chat.id
@@ -219,6 +192,9 @@ async def system_info(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text("You must be an admin to use this command.")
         return
 
+    # psutil потрібен лише для /sysinfo; імпорт відкладено, щоб не сповільнювати старт
+    import psutil
+
     uptime = time.time() - psutil.boot_time()
     uptime_str = time.strftime('%H:%M:%S', time.gmtime(uptime))
     cpu_percent = psutil.cpu_percent()
@@ -226,29 +202,33 @@ async def system_info(update: Update, context: CallbackContext) -> None:
     memory_info = psutil.virtual_memory()
     total_memory = memory_info.total / (1024 ** 3)
     available_memory = memory_info.available / (1024 ** 3)
-    os_name = platform.system()
-    os_version = platform.version()
-    kernel_version = platform.release()
+    os_name, os_version, kernel_version = os_info()
 
-    try:
-        with open('version', 'r') as version_file:
-            bot_version = version_file.read().strip()
-    except FileNotFoundError:
-        bot_version = "Unknown"
+    moderation = moderation_queue.stats()
+    updates = queue_depth(context.application)
 
-   # Retrieve bot's details
-    bot_info = await context.bot.get_me()
-    bot_name = bot_info.first_name
+    # Дані бота отримані під час initialize(), окремий getMe не потрібен
+    bot_name = context.bot.first_name
     
     message = (
-        f"<b>{bot_name} v.{bot_version}</b> \n\n"
+        f"<b>{bot_name} v.{bot_version()}</b> \n\n"
         f"<b>OS:</b> {os_name} {os_version}\n"
         f"<b>Kernel Version:</b> {kernel_version}\n"
         f"<b>System Uptime:</b> {uptime_str}\n\n"
         f"<b>CPU Usage:</b> {cpu_percent}%\n"
         f"<b>RAM Usage:</b> {ram_percent}%\n\n"
         f"<b>Total Memory:</b> {total_memory:.2f} GB\n"
-        f"<b>Available Memory:</b> {available_memory:.2f} GB"
+        f"<b>Available Memory:</b> {available_memory:.2f} GB\n\n"
+        f"<b>Cache hit ratio:</b> devices {devices_cache.stats()['hit_ratio']:.0%}, "
+        f"releases {listing_cache.stats()['hit_ratio']:.0%}, /rom pages {rom_pages.stats()['hit_ratio']:.0%}, admins {admin_cache.stats()['hit_ratio']:.0%}\n"
+        f"<b>Moderation:</b> backlog {moderation['backlog']}, {moderation['calls_per_second']:.2f} calls/s, "
+        f"{moderation['deleted']} deleted, {moderation['retries']} flood waits\n"
+        f"<b>Updates:</b> queue {updates['update_queue']}, running {updates.get('running', 0)}, "
+        f"waiting {updates.get('waiting', 0)}, background {updates.get('background', 0)}\n"
+        f"<b>Slowest handlers:</b> {', '.join(slowest_handlers()) or 'n/a'}\n"
+        f"<b>Handler errors:</b> {HANDLER_ERRORS.total():.0f}\n"
+        f"<b>Event loop lag:</b> p99 {LOOP_LAG.quantile(0.99) * 1000:.1f} ms\n"
+        f"<b>HTTP:</b> {'; '.join(http_summary()) or 'n/a'}"
     )
 
     await context.bot.send_message(chat_id=user_id, text=message, parse_mode='HTML')
@@ -261,21 +241,24 @@ async def clean(update: Update, context: CallbackContext) -> None:
         await update.message.reply_text('This channel is not initialized.')
         return
 
-    if not is_user_admin(update, context, user_id, chat_id):
+    if not await is_user_admin(update, context, user_id, chat_id):
         await update.message.reply_text("You must be an admin to use this command.")
         return
 
+    members = context.chat_data.get('members', set())
     try:
-        chat_administrators = await context.bot.get_chat_administrators(chat_id)
-        deleted_accounts = [member.user.id for member in chat_administrators if member.user.first_name == "Deleted Account"]
+        deleted_accounts = await find_deleted_accounts(context.bot, chat_id, members)
 
         for user_id in deleted_accounts:
-            await context.bot.kick_chat_member(chat_id, user_id)
-            logging.info(f"Kicked deleted account: {user_id}")
-
-        await update.message.reply_text(f"Cleaned up {len(deleted_accounts)} deleted accounts.")
-        logging.info(f"Cleaned {len(deleted_accounts)} deleted accounts from chat {chat_id}.")
+            await moderation_queue.kick(context.bot, chat_id, user_id)
+            members.discard(user_id)
+            logger.info(f"Kicked deleted account: {user_id}")
+
+        await update.message.reply_text(
+            f"Checked {len(members) + len(deleted_accounts)} known members, "
+            f"cleaned up {len(deleted_accounts)} deleted accounts."
+        )
+        logger.info(f"Cleaned {len(deleted_accounts)} deleted accounts from chat {chat_id}.")
     except Exception as e:
         await update.message.reply_text(f"An error occurred: {e}")
-        logging.error(f"Error cleaning deleted accounts: {e}")
-
+        logger.error(f"Error cleaning deleted accounts: {e}")
@@ -1,41 +1,84 @@
 import logging
+import os
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
 from telegram import Update
 from telegram.ext import CallbackContext, ContextTypes
 
-from utils import load_channels
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='bot.log'  # Файл, в который будут записываться логи
-)
+from moderation import moderation_queue
 
 logger = logging.getLogger(__name__)
 
+# Хештеги за замовчуванням, якщо для каналу не задано власних
+DEFAULT_SUGGESTION_TAGS = os.getenv('SUGGESTION_TAGS', '#suggestion').split(',')
 
-async def delete_non_suggestion_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    chat_id = update.effective_chat.id
-    message_thread_id = update.message.message_thread_id
-
-    logger.info(f"Checking message {update.message.message_id} in thread {message_thread_id}")
-
-    # Load the channels list
-    channels = await load_channels()
-
-    # Find the chat in the channels list by chat_id
-    for channel in channels:
-        if channel['channel_id'] == str(chat_id):
-            topic_suggestion = channel.get('topic_suggestion')
-            if topic_suggestion and str(message_thread_id) == topic_suggestion:
-                logger.info(f"Message {update.message.message_id} matched topic_suggestion {topic_suggestion}")
-                # Check if the message text does not contain #suggestion
-                if '#suggestion' not in update.message.text:
-                    try:
-                        await context.bot.delete_message(chat_id, update.message.message_id)
-                        logger.info(f"Deleted message {update.message.message_id} in thread {message_thread_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to delete message {update.message.message_id}: {e}")
-            break
 
+class FilterRule:
+    """Hashtags and regexes a message must match to stay in the suggestion topic.
+
+    The default tags apply only when neither tags nor patterns are given, so
+    a rule made of patterns alone does not let ``#suggestion`` through.
+    Patterns are compiled one by one, so each may carry its own global
+    flags such as ``(?i)``.
+    """
+
+    __slots__ = ('tags', 'patterns', '_tag_regex', '_pattern_regexes')
+
+    def __init__(self, tags: Iterable[str] = (), patterns: Iterable[str] = ()):
+        self.tags = list(tags)
+        self.patterns = list(patterns)
+        if not self.tags and not self.patterns:
+            self.tags = DEFAULT_SUGGESTION_TAGS
+        # Хештеги зводяться до одного виразу; шаблони перевіряються по черзі
+        self._tag_regex = re.compile('|'.join(re.escape(tag) for tag in self.tags)) if self.tags else None
+        self._pattern_regexes = tuple(re.compile(pattern) for pattern in self.patterns)
+
+    def allows(self, text: str) -> bool:
+        if self._tag_regex is not None and self._tag_regex.search(text) is not None:
+            return True
+        return any(regex.search(text) is not None for regex in self._pattern_regexes)
+
+
+def parse_topic_key(chat_id, topic_suggestion: str) -> Tuple[int, Optional[int]]:
+    # set_topic поза темою зберігає 'None' — такий канал фільтрує повідомлення без теми
+    return int(chat_id), None if topic_suggestion == 'None' else int(topic_suggestion)
+
+
+class SuggestionFilter:
+    """Precompiled ``(chat_id, message_thread_id) -> FilterRule`` lookup."""
+
+    def __init__(self):
+        self.rules: Dict[Tuple[int, Optional[int]], FilterRule] = {}
+        self._keys_by_chat: Dict[str, Tuple[int, Optional[int]]] = {}
+
+    def update_channel(self, channel: Dict[str, Any]):
+        """Rebuild the rule of one channel; registered as a ChannelRegistry listener."""
+        old_key = self._keys_by_chat.pop(channel['channel_id'], None)
+        if old_key is not None:
+            del self.rules[old_key]
+
+        topic_suggestion = channel.get('topic_suggestion')
+        if not topic_suggestion:
+            return
+        try:
+            key = parse_topic_key(channel['channel_id'], topic_suggestion)
+            rule = FilterRule(channel.get('suggestion_tags', ()), channel.get('suggestion_patterns', ()))
+        except (ValueError, re.error) as e:
+            logger.error(f"Invalid suggestion filter for channel {channel['channel_id']}: {e}")
+            return
+        self.rules[key] = rule
+        self._keys_by_chat[channel['channel_id']] = key
+
+
+suggestion_filter = SuggestionFilter()
+
+
+async def delete_non_suggestion_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    message = update.effective_message
+    rule = suggestion_filter.rules.get((message.chat_id, message.message_thread_id))
+    if rule is None or rule.allows(message.text):
+        return
 
+    # Видалення збираються в пакети та виконуються у фоні
+    moderation_queue.delete(context.bot, message.chat_id, message.message_id)
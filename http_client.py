@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from telegram.request import HTTPXRequest, RequestData
+
+from metrics import HTTP_ERRORS, HTTP_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Статуси, після яких має сенс повторити запит
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """Shared non-blocking HTTP client for all outbound fetches of the bot.
+
+    Wraps a single ``httpx.AsyncClient`` (connection pool + keep-alive) and adds
+    a per-host concurrency limit and retries with exponential backoff.
+    ``transport`` replaces the network, e.g. with fixtures in benchmarks.
+    """
+
+    def __init__(self, timeout: float = 15.0, max_connections: int = 20, per_host_limit: int = 4,
+                 retries: int = 3, backoff: float = 0.5, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def start(self):
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            follow_redirects=True,
+            headers={'User-Agent': 'CraftRomBot'},
+            transport=self.transport,
+        )
+        logger.info("HTTP client started")
+
+    async def stop(self):
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+        self._host_limits.clear()
+        logger.info("HTTP client stopped")
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET ``url``, retrying transport errors and 429/5xx responses.
+
+        The response is returned as is; callers decide what to do with the status.
+        Raises ``httpx.HTTPError`` when every attempt failed on the transport level.
+        """
+        if self._client is None:
+            # Клієнт ще не запущений (наприклад, виклик поза життєвим циклом Application)
+            await self.start()
+
+        host = urlsplit(url).netloc
+        async with self._host_limit(host):
+            for attempt in range(self.retries + 1):
+                started = time.perf_counter()
+                try:
+                    response = await self._client.get(url, headers=headers)
+                    HTTP_LATENCY.observe(time.perf_counter() - started, host=host)
+                    if response.status_code not in RETRY_STATUSES:
+                        return response
+                    HTTP_ERRORS.inc(host=host)
+                    if attempt == self.retries:
+                        return response
+                    logger.warning(f"GET {url} returned {response.status_code}, retrying")
+                except httpx.TransportError as e:
+                    HTTP_ERRORS.inc(host=host)
+                    if attempt == self.retries:
+                        raise
+                    logger.warning(f"GET {url} failed: {e}, retrying")
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+
+class TelegramRequest(HTTPXRequest):
+    """Bot API transport that records call latency in the per-host HTTP metrics."""
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        host = urlsplit(url).netloc
+        started = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, request_data, read_timeout, write_timeout,
+                                                     connect_timeout, pool_timeout)
+        except Exception:
+            HTTP_ERRORS.inc(host=host)
+            raise
+        finally:
+            HTTP_LATENCY.observe(time.perf_counter() - started, host=host)
+        if code >= 500 or code == 429:
+            HTTP_ERRORS.inc(host=host)
+        return code, payload
+
+
+http_client = HttpClient(
+    timeout=float(os.getenv('HTTP_TIMEOUT', '15')),
+    per_host_limit=int(os.getenv('HTTP_PER_HOST_LIMIT', '4')),
+    retries=int(os.getenv('HTTP_RETRIES', '3')),
+)
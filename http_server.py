@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+    411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class Request:
+    def __init__(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+
+class Response:
+    def __init__(self, status: int = 200, body: bytes = b'', content_type: str = 'text/plain; charset=utf-8',
+                 headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    @classmethod
+    def json(cls, data, status: int = 200) -> 'Response':
+        return cls(status, json.dumps(data).encode(), 'application/json')
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class HttpServer:
+    """Minimal HTTP/1.1 server on asyncio streams with keep-alive.
+
+    Only what the webhook and metrics endpoints need: exact-path routing,
+    Content-Length bodies and a body size limit. Meant to sit behind a
+    reverse proxy that terminates TLS.
+    """
+
+    def __init__(self, host: str, port: int, max_body: int = 1024 * 1024, idle_timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.idle_timeout = idle_timeout
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._busy: Set[asyncio.Task] = set()
+
+    def route(self, method: str, path: str, handler: Handler):
+        self._routes[(method, path)] = handler
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        logger.info(f"HTTP server listening on {self.host}:{self.port}")
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop accepting connections, let requests in progress finish, close idle ones."""
+        if self._server is None:
+            return
+        self._server.close()
+        for task in self._connections - self._busy:
+            task.cancel()
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=timeout)
+        for task in self._connections:
+            task.cancel()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+                if not request_line:
+                    break
+                self._busy.add(task)
+                response, keep_alive = await self._handle(request_line, reader)
+                await self._write(writer, response, keep_alive)
+                self._busy.discard(task)
+                if not keep_alive or self._server is None or not self._server.is_serving():
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self._busy.discard(task)
+            self._connections.discard(task)
+            writer.close()
+
+    async def _handle(self, request_line: bytes, reader: asyncio.StreamReader) -> Tuple[Response, bool]:
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            return Response(400), False
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+        if 'transfer-encoding' in headers:
+            return Response(411), False
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            return Response(400), False
+        if length > self.max_body:
+            return Response(413), False
+        body = await reader.readexactly(length) if length else b''
+
+        path = target.split('?', 1)[0]
+        handler = self._routes.get((method, path))
+        if handler is None:
+            status = 405 if any(route_path == path for _, route_path in self._routes) else 404
+            return Response(status), keep_alive
+        try:
+            return await handler(Request(method, path, headers, body)), keep_alive
+        except Exception as e:
+            logger.error(f"Error handling {method} {path}: {e}")
+            return Response(500), keep_alive
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: Response, keep_alive: bool):
+        head = [
+            f"HTTP/1.1 {response.status} {REASONS.get(response.status, '')}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {len(response.body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        head.extend(f"{name}: {value}" for name, value in response.headers.items())
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + response.body)
+        await writer.drain()
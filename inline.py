@@ -0,0 +1,97 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from telegram import InlineQueryResultArticle, InputTextMessageContent, LinkPreviewOptions, Update
+from telegram.ext import ContextTypes
+
+from catalog import DeviceCatalog, devices_cache
+from metrics import CACHE_HIT_RATIO
+from responses import render_device_summary
+
+logger = logging.getLogger(__name__)
+
+INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '300'))
+# Telegram приймає не більше 50 результатів на запит
+INLINE_RESULTS_LIMIT = 50
+INLINE_MAX_PREFIXES = 4096
+
+
+def device_article(device: Dict[str, Any]) -> InlineQueryResultArticle:
+    variant_names = ", ".join(device.get('variant_name', []))
+    return InlineQueryResultArticle(
+        id=device['codename'],
+        title=f"{device.get('brand')} | {device.get('name')}",
+        description=f"{device['codename']} ({variant_names})" if variant_names else device['codename'],
+        input_message_content=InputTextMessageContent(
+            render_device_summary(device),
+            parse_mode='HTML',
+            link_preview_options=LinkPreviewOptions(is_disabled=True),
+        ),
+    )
+
+
+class InlineResults:
+    """Inline query results per catalogue revision.
+
+    Articles are built once per device and the result list of every prefix
+    typed so far is memoised, so a keystroke costs a dict lookup. Everything
+    is dropped when the catalogue revision changes.
+    """
+
+    def __init__(self, max_prefixes: int = INLINE_MAX_PREFIXES):
+        self.max_prefixes = max_prefixes
+        self._revision: Optional[int] = None
+        self._articles: Dict[str, InlineQueryResultArticle] = {}
+        self._results: Dict[str, List[InlineQueryResultArticle]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, catalog: DeviceCatalog, query: str) -> List[InlineQueryResultArticle]:
+        if catalog.revision != self._revision:
+            self._revision = catalog.revision
+            self._articles = {}
+            self._results = {}
+
+        prefix = query.strip().lower()
+        results = self._results.get(prefix)
+        if results is not None:
+            self.hits += 1
+            return results
+
+        self.misses += 1
+        results = []
+        for device in catalog.complete(prefix, INLINE_RESULTS_LIMIT):
+            article = self._articles.get(device['codename'])
+            if article is None:
+                article = self._articles[device['codename']] = device_article(device)
+            results.append(article)
+        # Довільні запити не повинні роздувати кеш
+        if len(self._results) >= self.max_prefixes:
+            self._results.clear()
+        self._results[prefix] = results
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'prefixes': len(self._results),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+inline_results = InlineResults()
+CACHE_HIT_RATIO.set_function(lambda: inline_results.stats()['hit_ratio'], cache='inline')
+
+
+async def inline_rom(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Autocomplete device codenames and variant names in inline mode."""
+    # Лише те, що вже в пам'яті: мережевий запит тут не виконується
+    catalog = devices_cache.peek()
+    if catalog is None:
+        await update.inline_query.answer([], cache_time=5)
+        return
+    await update.inline_query.answer(inline_results.get(catalog, update.inline_query.query),
+                                     cache_time=INLINE_CACHE_TIME)
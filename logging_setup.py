@@ -0,0 +1,175 @@
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+# Записів на секунду для шумних логерів: "logger=rate,..."; WARNING і вище не обмежуються
+LOG_RATE_LIMITS = os.getenv('LOG_RATE_LIMITS', 'httpx=1,commands=20')
+
+chat_id_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('chat_id', default=None)
+update_id_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('update_id', default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_update(update: object) -> Tuple[contextvars.Token, contextvars.Token]:
+    """Tag log records of the current task with the update's chat and update ids."""
+    chat = getattr(update, 'effective_chat', None)
+    return (
+        chat_id_var.set(chat.id if chat is not None else None),
+        update_id_var.set(getattr(update, 'update_id', None)),
+    )
+
+
+def unbind_update(tokens: Tuple[contextvars.Token, contextvars.Token]):
+    chat_id_var.reset(tokens[0])
+    update_id_var.reset(tokens[1])
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, rate = item.partition('=')
+        limits[name.strip()] = float(rate)
+    return limits
+
+
+class ContextFilter(logging.Filter):
+    """Copies the contextvars onto the record while still on the emitting thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.chat_id = chat_id_var.get()
+        record.update_id = update_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per configured logger (and its children) for records below WARNING.
+
+    Dropped records are counted and reported as ``suppressed`` on the next
+    record from the same logger that gets through.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        # logger name -> [tokens, updated_at, suppressed]
+        self._buckets: Dict[str, list] = {}
+        self._limit_of: Dict[str, Optional[str]] = {}
+
+    def _limit_name(self, name: str) -> Optional[str]:
+        # Найдовший налаштований префікс; результат кешується для кожного логера
+        if name not in self._limit_of:
+            candidates = [limit for limit in self.rates if name == limit or name.startswith(limit + '.')]
+            self._limit_of[name] = max(candidates, key=len) if candidates else None
+        return self._limit_of[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        limit = self._limit_name(record.name)
+        if limit is None:
+            return True
+
+        rate = self.rates[limit]
+        now = time.monotonic()
+        bucket = self._buckets.get(limit)
+        if bucket is None:
+            bucket = self._buckets[limit] = [rate, now, 0]
+        bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1
+        if bucket[2]:
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in ('chat_id', 'update_id', 'suppressed'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records with the message merged but the traceback kept in its own field."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(path: str = LOG_FILE, level: str = LOG_LEVEL, console: bool = bool(os.getenv('LOG_CONSOLE'))):
+    """Route all logging through a queue to a rotating JSON file; safe to call more than once.
+
+    Handlers only put records on a queue; formatting and file I/O happen in
+    the QueueListener thread, so logging never blocks the event loop.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(parse_rate_limits(LOG_RATE_LIMITS)))
+    queue_handler.addFilter(ContextFilter())
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        handlers.append(stream_handler)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
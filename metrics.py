@@ -0,0 +1,261 @@
+import abc
+import asyncio
+import bisect
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from http_server import HttpServer, Request, Response
+
+logger = logging.getLogger(__name__)
+
+# Межі бакетів у секундах: від швидких обробників до повільного скрапінгу
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric(abc.ABC):
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """A value that is either set directly or read from a callback at scrape time."""
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, func: Callable[[], float], **labels):
+        self._functions[self._key(labels)] = func
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        func = self._functions.get(key)
+        return func() if func is not None else self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        for key, func in self._functions.items():
+            try:
+                values[key] = func()
+            except Exception as e:
+                logger.error(f"Failed to collect {self.name}: {e}")
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values.items()]
+
+
+class _HistogramSeries:
+    __slots__ = ('buckets', 'count', 'sum', 'max')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Histogram(Metric):
+    """Fixed-bucket histogram; ``observe`` is a bisect and three additions."""
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.upper_bounds = tuple(sorted(buckets)) + (float('inf'),)
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def _get_series(self, key: LabelValues) -> _HistogramSeries:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.upper_bounds))
+        return series
+
+    def observe(self, value: float, **labels):
+        series = self._get_series(self._key(labels))
+        series.buckets[bisect.bisect_left(self.upper_bounds, value)] += 1
+        series.count += 1
+        series.sum += value
+        if value > series.max:
+            series.max = value
+
+    def series(self) -> Dict[LabelValues, _HistogramSeries]:
+        return self._series
+
+    def quantile(self, q: float, **labels) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (capped by the observed maximum)."""
+        series = self._series.get(self._key(labels))
+        if series is None or not series.count:
+            return 0.0
+        rank = q * series.count
+        seen = 0
+        for upper_bound, count in zip(self.upper_bounds, series.buckets):
+            seen += count
+            if seen >= rank:
+                return min(upper_bound, series.max)
+        return series.max
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for upper_bound, count in zip(self.upper_bounds, series.buckets):
+                cumulative += count
+                le = f'le="{_format_value(upper_bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+HANDLER_LATENCY = Histogram('bot_handler_duration_seconds', "Handler callback latency.", ('handler',))
+HANDLER_ERRORS = Counter('bot_handler_errors_total', "Handler callbacks that raised.", ('handler',))
+HTTP_LATENCY = Histogram('bot_http_request_duration_seconds', "Outbound HTTP request latency per host.", ('host',))
+HTTP_ERRORS = Counter('bot_http_errors_total', "Outbound HTTP requests that failed or returned 5xx/429.", ('host',))
+CACHE_HIT_RATIO = Gauge('bot_cache_hit_ratio', "Hit ratio of in-process caches.", ('cache',))
+QUEUE_DEPTH = Gauge('bot_queue_depth', "Items waiting in internal queues.", ('queue',))
+LOOP_LAG = Histogram('bot_event_loop_lag_seconds', "Delay of event loop wake-ups past their deadline.")
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+class MetricsServer:
+    """Serves ``GET /metrics`` in the Prometheus text format.
+
+    The endpoint is optional: if the port cannot be bound the bot keeps
+    running without it.
+    """
+
+    def __init__(self, host: str, port: int, registry: Registry = REGISTRY):
+        self.registry = registry
+        self.server = HttpServer(host, port)
+        self.server.route('GET', '/metrics', self.handle_metrics)
+
+    async def handle_metrics(self, request: Request) -> Response:
+        return Response(200, self.registry.render().encode(), 'text/plain; version=0.0.4; charset=utf-8')
+
+    async def start(self):
+        try:
+            await self.server.start()
+        except OSError as e:
+            logger.warning(f"Metrics endpoint disabled, cannot listen on {self.server.host}:{self.server.port}: {e}")
+
+    async def stop(self):
+        await self.server.stop()
+
+
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+# 0 вимикає ендпоінт
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))
+
+loop_lag_monitor = LoopLagMonitor()
+metrics_server = MetricsServer(METRICS_LISTEN, METRICS_PORT)
+
+
+def http_summary() -> List[str]:
+    return [
+        f"{key[0]} {series.sum / series.count * 1000:.0f} ms avg, p99 {HTTP_LATENCY.quantile(0.99, host=key[0]) * 1000:.0f} ms"
+        for key, series in sorted(HTTP_LATENCY.series().items()) if series.count
+    ]
+
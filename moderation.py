@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, TypeVar
+
+from telegram import ChatMember, Update
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import ContextTypes
+
+from metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Telegram приймає до 100 ідентифікаторів за один deleteMessages
+DELETE_BATCH_SIZE = 100
+
+
+class TokenBucket:
+    """Token-bucket limiter that can also be paused for a RetryAfter period."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ModerationQueue:
+    """Per-chat queue of moderation API calls paced by a shared TokenBucket.
+
+    Message deletions are collected for ``batch_delay`` seconds and sent with
+    bulk deleteMessages calls; other calls go through ``call`` one by one.
+    """
+
+    def __init__(self, limiter: TokenBucket, batch_delay: float = 0.5):
+        self.limiter = limiter
+        self.batch_delay = batch_delay
+        self._pending: Dict[int, List[int]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._started_at = time.monotonic()
+        self.calls = 0
+        self.deleted = 0
+        self.kicked = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            await self.limiter.acquire()
+            try:
+                result = await func()
+                self.calls += 1
+                return result
+            except RetryAfter as e:
+                self.retries += 1
+                self.limiter.pause(e.retry_after)
+                logger.warning(f"Flood control exceeded, pausing moderation for {e.retry_after}s")
+
+    def delete(self, bot, chat_id: int, message_id: int):
+        """Schedule a message for deletion without waiting for it."""
+        self._pending.setdefault(chat_id, []).append(message_id)
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            self._workers[chat_id] = asyncio.create_task(self._drain(bot, chat_id))
+
+    async def _drain(self, bot, chat_id: int):
+        # Невелика затримка, щоб зібрати хвилю спаму в один запит
+        await asyncio.sleep(self.batch_delay)
+        pending = self._pending[chat_id]
+        while pending:
+            batch = pending[:DELETE_BATCH_SIZE]
+            del pending[:DELETE_BATCH_SIZE]
+            try:
+                await self.call(lambda: bot.delete_messages(chat_id, batch))
+                self.deleted += len(batch)
+            except TelegramError as e:
+                self.failures += 1
+                logger.error(f"Failed to delete {len(batch)} messages in chat {chat_id}: {e}")
+        del self._pending[chat_id]
+
+    async def kick(self, bot, chat_id: int, user_id: int):
+        await self.call(lambda: bot.ban_chat_member(chat_id, user_id))
+        self.kicked += 1
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started_at
+        return {
+            'backlog': sum(len(pending) for pending in self._pending.values()),
+            'calls': self.calls,
+            'deleted': self.deleted,
+            'kicked': self.kicked,
+            'retries': self.retries,
+            'failures': self.failures,
+            'calls_per_second': self.calls / elapsed if elapsed else 0.0,
+        }
+
+    async def close(self):
+        # Дочекатися видалення того, що вже в черзі
+        workers = [worker for worker in self._workers.values() if not worker.done()]
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+
+
+moderation_queue = ModerationQueue(
+    TokenBucket(rate=float(os.getenv('MODERATION_RATE', '20')), capacity=float(os.getenv('MODERATION_BURST', '20'))),
+)
+QUEUE_DEPTH.set_function(lambda: moderation_queue.stats()['backlog'], queue='moderation')
+
+
+async def remember_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Record who writes in a group, so /clean has members to scan."""
+    message = update.effective_message
+    members = context.chat_data.setdefault('members', set())
+    if message.from_user is not None:
+        members.add(message.from_user.id)
+    for user in message.new_chat_members or ():
+        members.add(user.id)
+
+
+def is_deleted_account(member: ChatMember) -> bool:
+    return member.user.first_name == "Deleted Account" or not member.user.first_name
+
+
+async def find_deleted_accounts(bot, chat_id: int, user_ids) -> List[int]:
+    """Check known members through the paced queue; returns ids of deleted accounts."""
+    deleted = []
+    for user_id in list(user_ids):
+        try:
+            member = await moderation_queue.call(lambda: bot.get_chat_member(chat_id, user_id))
+        except TelegramError as e:
+            logger.warning(f"Could not check member {user_id} of chat {chat_id}: {e}")
+            continue
+        if member.status in (ChatMember.LEFT, ChatMember.BANNED):
+            user_ids.discard(user_id)
+        elif is_deleted_account(member):
+            deleted.append(user_id)
+    return deleted
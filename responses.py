@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from catalog import DeviceCatalog
+from metrics import CACHE_HIT_RATIO
+from sourceforge import FileInfo, listing_cache, release_url
+
+logger = logging.getLogger(__name__)
+
+# Кодові імена гілок CRAFT ROM і відповідні версії Android
+ANDROID_VERSIONS = {
+    'thrall': 'Android 13',
+    'uther': 'Android 14',
+}
+
+# Скільки пристроїв фоновий прогрів оновлює одночасно
+ROM_REFRESH_CONCURRENCY = int(os.getenv('ROM_REFRESH_CONCURRENCY', '4'))
+
+START_MESSAGE = (
+    '<b>Welcome! This is your bot, ready to assist you.</b>\n\n'
+    '<b>Description:</b>\n'
+    'This bot provides information about supported devices for CRAFT ROM, including the latest available versions and download links.\n\n'
+    '<b>Available Commands:</b>\n'
+    '<code>/start</code> - Display this welcome message and list of commands.\n'
+    '<code>/rom [device_code]</code> - Get information about the specified device code.\n'
+    '<code>/rom</code> - Get a list of all supported device codes.\n'
+    'Example: <code>/rom onclite</code>'
+)
+
+ROM_FOOTER = (
+    "<i>Discuss device's, feature's, or just chat about everything.</i>\n"
+    '<a href="https://discord.gg/vErZGrSyqD">DISCORD CRAFTROM</a> | '
+    '<a href="http://t.me/craftrom">CHAT CRAFTROM</a> | '
+    '<a href="http://t.me/craftrom_news">NEWS</a>'
+)
+
+# Що саме показується про версію: зміна будь-якого поля означає новий реліз
+ListingSignature = Optional[Tuple[str, str, str, str]]
+
+
+def version_label(version_code: str) -> str:
+    android = ANDROID_VERSIONS.get(version_code)
+    return f"{version_code} ({android})" if android else version_code
+
+
+def version_status(version: Dict[str, Any]) -> str:
+    status = "Stable" if version.get('stable') else "Unstable"
+    if version.get('deprecated'):
+        status += " (Deprecated)"
+    return status
+
+
+def latest_versions(device: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return device.get('supported_versions', [])[-2:]
+
+
+def listing_signature(files_list: List[FileInfo]) -> ListingSignature:
+    if not files_list:
+        return None
+    file_info = files_list[0]
+    return file_info.name, file_info.last_updated, file_info.size, file_info.download_link
+
+
+def render_version(version: Dict[str, Any], files_list: Optional[List[FileInfo]]) -> str:
+    label = version_label(version.get('version_code'))
+    if files_list is None:
+        return f'▪️<b>Version:</b> {label} (Error checking availability)'
+    if not files_list:
+        return f'▪️<b>Version:</b> {label} (Not available)'
+
+    file_info = files_list[0]
+    return (
+        f'▪️<b>Version:</b> {label}\n'
+        f' • <i>Date:</i> {file_info.last_updated}\n'
+        f' • <i>Status:</i> {version_status(version)}\n'
+        f' • <i>Download:</i> <a href="{file_info.download_link}">{file_info.name}</a> ({file_info.size})'
+    )
+
+
+def render_rom_page(device: Dict[str, Any], listings: List[Optional[List[FileInfo]]]) -> str:
+    device_code = device['codename']
+    versions_text = "\n".join(
+        render_version(version, files_list) for version, files_list in zip(latest_versions(device), listings)
+    )
+    return (
+        f"#{device_code} #rom\n"
+        f"<b>{device.get('brand')} | {device.get('name')}</b>\n\n"
+        f'Device information: <a href="https://craft-rom.pp.ua/devices/{device_code}/">here</a>\n\n'
+        f"▪️<b>Device codename:</b> {device_code}\n"
+        f"▪️<b>Variant names:</b> {', '.join(device.get('variant_name', []))}\n"
+        f"▪️<b>Maintainer:</b> {device.get('maintainers', 'No maintainers')}\n"
+        f"{versions_text}\n\n\n"
+        f"{ROM_FOOTER}"
+    )
+
+
+def render_device_summary(device: Dict[str, Any]) -> str:
+    """Catalogue-only /rom variant for inline results: no listing, so no scraping."""
+    device_code = device['codename']
+    versions_text = "\n".join(
+        f"▪️<b>Version:</b> {version_label(version.get('version_code'))} ({version_status(version)})"
+        for version in latest_versions(device)
+    )
+    return (
+        f"#{device_code} #rom\n"
+        f"<b>{device.get('brand')} | {device.get('name')}</b>\n\n"
+        f'Device information: <a href="https://craft-rom.pp.ua/devices/{device_code}/">here</a>\n\n'
+        f"▪️<b>Device codename:</b> {device_code}\n"
+        f"▪️<b>Variant names:</b> {', '.join(device.get('variant_name', []))}\n"
+        f"▪️<b>Maintainer:</b> {device.get('maintainers', 'No maintainers')}\n"
+        f"{versions_text}\n\n"
+        f"Latest builds: <code>/rom {device_code}</code>"
+    )
+
+
+class RomPageCache:
+    """Rendered /rom messages keyed by device codename.
+
+    A page is stored together with the catalogue revision and the signature of
+    the newest file in each listing it shows, and is rendered again only when
+    one of them changes. Pages with a failed listing are not stored.
+    """
+
+    def __init__(self):
+        self._pages: Dict[str, Tuple[Tuple[int, Tuple[ListingSignature, ...]], str]] = {}
+        self.hits = 0
+        self.renders = 0
+
+    async def _listing(self, device_code: str, version_code: str, refresh: bool) -> Optional[List[FileInfo]]:
+        try:
+            return await listing_cache.get(release_url(device_code, version_code), refresh=refresh)
+        except httpx.HTTPError as e:
+            logger.error(f"Error checking availability for {device_code}/{version_code}: {e}")
+            return None
+
+    async def get(self, catalog: DeviceCatalog, device: Dict[str, Any], refresh: bool = False) -> str:
+        device_code = device['codename']
+        listings = await asyncio.gather(
+            *(self._listing(device_code, version.get('version_code'), refresh) for version in latest_versions(device))
+        )
+        return self.render(catalog, device, listings)
+
+    def render(self, catalog: DeviceCatalog, device: Dict[str, Any],
+               listings: List[Optional[List[FileInfo]]]) -> str:
+        """Return the page for already fetched ``listings``, rendering it only if they changed."""
+        device_code = device['codename']
+        if any(files_list is None for files_list in listings):
+            self.renders += 1
+            return render_rom_page(device, listings)
+
+        key = (catalog.revision, tuple(listing_signature(files_list) for files_list in listings))
+        page = self._pages.get(device_code)
+        if page is not None and page[0] == key:
+            self.hits += 1
+            return page[1]
+
+        self.renders += 1
+        text = render_rom_page(device, listings)
+        self._pages[device_code] = (key, text)
+        return text
+
+    async def warm(self, catalog: DeviceCatalog, refresh: bool = False):
+        """Re-render the pages that changed; ``refresh=True`` re-scrapes the listings first."""
+        limit = asyncio.Semaphore(ROM_REFRESH_CONCURRENCY)
+
+        async def warm_page(device):
+            async with limit:
+                await self.get(catalog, device, refresh)
+
+        await asyncio.gather(*(warm_page(device) for device in catalog.devices))
+        # Пристрої, що зникли з каталогу
+        codenames = {device['codename'] for device in catalog.devices}
+        for device_code in self._pages.keys() - codenames:
+            del self._pages[device_code]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.renders
+        return {
+            'pages': len(self._pages),
+            'hits': self.hits,
+            'renders': self.renders,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+rom_pages = RomPageCache()
+CACHE_HIT_RATIO.set_function(lambda: rom_pages.stats()['hit_ratio'], cache='rom_pages')
+
@@ -18,11 +18,16 @@ if ! command -v pip &>/dev/null; then
     sudo apt install -y python3-pip
 fi
 
-echo "Installing dependencies..."
-pip install --upgrade pip
-pip install -r requirements.txt >> $LOGFILE 2>&1 || { echo "Failed to install requirements" >> $LOGFILE; exit 1; }
+# Залежності встановлюються лише коли змінився requirements.txt, щоб перезапуск був швидким
+REQUIREMENTS_STAMP=".requirements.sha256"
+if ! sha256sum --status -c "$REQUIREMENTS_STAMP" 2>/dev/null; then
+    echo "Installing dependencies..."
+    pip install --upgrade pip
+    pip install -r requirements.txt >> $LOGFILE 2>&1 || { echo "Failed to install requirements" >> $LOGFILE; exit 1; }
+    sha256sum requirements.txt > "$REQUIREMENTS_STAMP"
+fi
 
-# Запустіть ваш бот
+# Запустіть ваш бот (BOT_MODE=supervisor BOT_WORKERS=N — кілька робочих процесів із шардингом за чатом)
 python3 bot_start.py >> $LOGFILE 2>&1 || { echo "Failed to start bot" >> $LOGFILE; exit 1; }
 
 echo "Bot script finished at $(date)" >> $LOGFILE
@@ -0,0 +1,207 @@
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Dict, Hashable, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+
+from logging_setup import bind_update, unbind_update
+from metrics import HANDLER_ERRORS, HANDLER_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+def ordering_key(update: object) -> Optional[Hashable]:
+    """Updates with the same key are processed strictly in arrival order."""
+    if not isinstance(update, Update) or update.effective_chat is None:
+        return None
+    message = update.effective_message
+    return update.effective_chat.id, message.message_thread_id if message is not None else None
+
+
+class _Lane:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates of different chats concurrently, one chat/thread at a time.
+
+    ``workers`` limits how many updates, and how many ``block=False`` handler
+    callbacks (see ``limit_non_blocking_handlers``), run at once. Each
+    chat/thread lane is a FIFO lock, so updates in one topic never overtake
+    each other; a ``block=False`` handler leaves the lane as soon as it starts.
+
+    ``max_pending`` bounds how many updates are taken off the update queue and
+    not yet finished. Application's fetcher starts a task for every update it
+    gets, so the limit is applied by the queue from ``update_queue()``: its
+    ``get`` waits for a free slot and leaves the rest in the queue. Only a
+    bounded queue pushes back: once it is full the webhook answers 503 and
+    the polling Updater waits on ``put`` instead of fetching more.
+    """
+
+    def __init__(self, workers: int, max_pending: int = 1024):
+        super().__init__(max(max_pending, workers, 2))
+        self.workers = workers
+        self.max_pending = self.max_concurrent_updates
+        self._worker_slots = asyncio.Semaphore(workers)
+        self._pending_slots = asyncio.Semaphore(self.max_pending)
+        self._lanes: Dict[Hashable, _Lane] = {}
+        self.admitted = 0
+        self.running = 0
+        self.background = 0
+        self.processed = 0
+
+    def update_queue(self, maxsize: int = 0) -> 'AdmissionQueue':
+        """The queue to pass to ``ApplicationBuilder.update_queue``."""
+        return AdmissionQueue(self, maxsize)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        key = ordering_key(update)
+        lane = None
+        if key is not None:
+            lane = self._lanes.get(key)
+            if lane is None:
+                lane = self._lanes[key] = _Lane()
+            lane.users += 1
+
+        try:
+            if lane is None:
+                async with self._worker_slots:
+                    await self._run(update, coroutine)
+            else:
+                async with lane.lock, self._worker_slots:
+                    await self._run(update, coroutine)
+        finally:
+            self.processed += 1
+            if lane is not None:
+                lane.users -= 1
+                if not lane.users:
+                    del self._lanes[key]
+
+    async def _run(self, update: object, coroutine: Awaitable[Any]):
+        self.running += 1
+        # Записи журналу цього оновлення (і задач, створених з нього) отримують chat_id/update_id
+        tokens = bind_update(update)
+        try:
+            await coroutine
+        finally:
+            unbind_update(tokens)
+            self.running -= 1
+
+    def limited(self, callback):
+        """Wrap a ``block=False`` handler callback so it waits for a worker slot."""
+
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            async with self._worker_slots:
+                self.background += 1
+                try:
+                    return await callback(update, context)
+                finally:
+                    self.background -= 1
+
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'running': self.running,
+            'background': self.background,
+            # Прийняті з черги оновлення, які ще чекають на свій чат або вільного обробника
+            'waiting': max(self.admitted - self.running, 0),
+            'lanes': len(self._lanes),
+            'processed': self.processed,
+        }
+
+
+class AdmissionQueue(asyncio.Queue):
+    """Update queue that hands an update out only when the processor has a pending slot for it.
+
+    Application calls ``task_done`` once an update has been processed (or
+    right after getting its stop signal), which frees the slot.
+    """
+
+    def __init__(self, processor: ChatOrderedUpdateProcessor, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.processor = processor
+        self._taken = 0
+
+    async def get(self):
+        await self.processor._pending_slots.acquire()
+        try:
+            item = await super().get()
+        except BaseException:
+            self.processor._pending_slots.release()
+            raise
+        self._taken += 1
+        self.processor.admitted += 1
+        return item
+
+    def task_done(self):
+        super().task_done()
+        # Під час зупинки Application забирає залишок черги через get_nowait, без слоту
+        if self._taken:
+            self._taken -= 1
+            self.processor.admitted -= 1
+            self.processor._pending_slots.release()
+
+
+def timed(callback):
+    """Wrap a handler callback to record its latency under its function name."""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, handler=name)
+
+    return wrapper
+
+
+def instrument_handlers(application: Application):
+    """Wrap the callbacks of every handler already added to ``application``."""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = timed(handler.callback)
+
+
+def limit_non_blocking_handlers(application: Application):
+    """Make ``block=False`` callbacks share the update processor's worker limit."""
+    processor = application.update_processor
+    if not isinstance(processor, ChatOrderedUpdateProcessor):
+        return
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if handler.block is False:
+                handler.callback = processor.limited(handler.callback)
+
+
+def queue_depth(application: Application) -> Dict[str, Any]:
+    depth = {'update_queue': application.update_queue.qsize()}
+    if isinstance(application.update_processor, ChatOrderedUpdateProcessor):
+        depth.update(application.update_processor.stats())
+    return depth
+
+
+def slowest_handlers(limit: int = 3) -> List[str]:
+    ranked = sorted(HANDLER_LATENCY.series().items(), key=lambda item: item[1].sum / max(item[1].count, 1),
+                    reverse=True)
+    return [f"{key[0]} {series.sum / series.count * 1000:.1f} ms" for key, series in ranked[:limit] if series.count]
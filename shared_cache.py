@@ -0,0 +1,79 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCache:
+    """Key/value cache with per-entry expiry in an SQLite file shared by worker processes.
+
+    Lets one process reuse what another has already fetched. Values are
+    stored as JSON; expiry uses wall-clock time since it is compared across
+    processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+        return self._connection
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return ``(value, expires_at)`` of a fresh entry, or None."""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key: str, value: Any, ttl: float):
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO cache (key, value, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+                (key, json.dumps(value), time.time() + ttl),
+            )
+
+    async def aget(self, key: str) -> Optional[Tuple[Any, float]]:
+        try:
+            return await asyncio.to_thread(self.get, key)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache read failed for {key}: {e}")
+            return None
+
+    async def aput(self, key: str, value: Any, ttl: float):
+        try:
+            await asyncio.to_thread(self.put, key, value, ttl)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache write failed for {key}: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def remaining_ttl(expires_at: float) -> float:
+    """Convert a shared wall-clock expiry into seconds left, for monotonic-clock caches."""
+    return max(0.0, expires_at - time.time())
+
+
+# Вмикається супервізором для робочих процесів; в одному процесі не потрібен
+shared_cache = SharedCache(os.environ['SHARED_CACHE_DB']) if os.getenv('SHARED_CACHE_DB') else None
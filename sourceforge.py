@@ -0,0 +1,189 @@
+import asyncio
+import html
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from http_client import http_client
+from metrics import CACHE_HIT_RATIO
+from shared_cache import remaining_ttl, shared_cache
+
+logger = logging.getLogger(__name__)
+
+FILES_URL = "https://sourceforge.net/projects/craftrom/files/{device_code}/{version_code}/"
+
+# Скільки рядків лістингу розбирати: /rom показує лише найновіший файл
+LISTING_ROWS = int(os.getenv('SOURCEFORGE_LISTING_ROWS', '5'))
+
+_ROW_RE = re.compile(rb'<tr\b[^>]*\bclass="(?:[^"]*\s)?file(?:\s[^"]*)?"[^>]*>(.*?)</tr>', re.S)
+_LOOSE_ROW_RE = re.compile(rb'<tr\b[^>]*\bclass=[\'"]?[^>]*\bfile\b')
+_LINK_RE = re.compile(rb'<a\b[^>]*?\bhref="([^"]*)"')
+_NAME_RE = re.compile(rb'<span\b[^>]*\bclass="name"[^>]*>(.*?)</span>', re.S)
+_DATE_RE = re.compile(rb'<td\b[^>]*\bheaders="files_date_h"[^>]*>.*?<abbr\b[^>]*\btitle="([^"]*)"', re.S)
+_SIZE_RE = re.compile(rb'<td\b[^>]*\bheaders="files_size_h"[^>]*>(.*?)</td>', re.S)
+_TAG_RE = re.compile(rb'<[^>]+>')
+
+
+class FileInfo:
+    def __init__(self, name: str, size: str, last_updated: str, download_link: str):
+        self.name = name
+        self.size = size
+        self.last_updated = last_updated
+        self.download_link = download_link
+
+
+def release_url(device_code: str, version_code: str) -> str:
+    return FILES_URL.format(device_code=device_code, version_code=version_code)
+
+
+def _text(fragment: bytes) -> str:
+    return html.unescape(_TAG_RE.sub(b'', fragment).decode('utf-8', 'replace')).strip()
+
+
+def _format_date(last_updated_str: str) -> str:
+    last_updated_date = datetime.strptime(last_updated_str, "%Y-%m-%d %H:%M:%S %Z")
+    return last_updated_date.strftime("%m/%d/%Y")
+
+
+def iter_files_list(content: bytes) -> Iterator[FileInfo]:
+    """Lazily yield ``FileInfo`` records from the raw bytes of a listing page.
+
+    Only the ``tr.file`` rows are matched, so nothing past the last row the
+    caller consumes is scanned. Raises ValueError on a row it cannot read.
+    """
+    for row in _ROW_RE.finditer(content):
+        body = row.group(1)
+        link = _LINK_RE.search(body)
+        name = _NAME_RE.search(body)
+        date = _DATE_RE.search(body)
+        size = _SIZE_RE.search(body)
+        if not (link and name and date and size):
+            raise ValueError("unexpected file row markup")
+        yield FileInfo(
+            _text(name.group(1)),
+            _text(size.group(1)),
+            _format_date(html.unescape(date.group(1).decode('utf-8', 'replace'))),
+            html.unescape(link.group(1).decode('utf-8', 'replace')),
+        )
+
+
+def parse_files_list_soup(content: bytes) -> List[FileInfo]:
+    # bs4 потрібен лише на нестандартній розмітці, тож не імпортуємо його на старті
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    files = []
+    for row in soup.select("tr.file"):
+        name = row.select_one("span.name").text.strip()
+        size = row.select_one("td.opt[headers=files_size_h]").text.strip()
+        last_updated = _format_date(row.select_one("td.opt[headers=files_date_h] abbr").get("title"))
+        download_link = row.select_one("a").get("href")
+        files.append(FileInfo(name, size, last_updated, download_link))
+    return files
+
+
+def parse_files_list(content: bytes, limit: Optional[int] = None) -> List[FileInfo]:
+    """Parse up to ``limit`` files, falling back to BeautifulSoup on unusual markup."""
+    try:
+        files = list(islice(iter_files_list(content), limit))
+        if files or not _LOOSE_ROW_RE.search(content):
+            return files
+        logger.warning("Fast listing parser found no file rows, falling back to BeautifulSoup")
+    except ValueError as e:
+        logger.warning(f"Fast listing parser failed ({e}), falling back to BeautifulSoup")
+    return parse_files_list_soup(content)[:limit]
+
+
+async def fetch_files_list(url: str, limit: Optional[int] = None) -> List[FileInfo]:
+    """Fetch and parse a SourceForge folder listing.
+
+    Network errors are raised as ``httpx.HTTPError``; a page that cannot be
+    parsed is logged and treated as an empty listing.
+    """
+    response = await http_client.get(url)
+    response.raise_for_status()
+    try:
+        return parse_files_list(response.content, limit)
+    except (ValueError, AttributeError) as e:
+        logger.error(f"Error while extracting files list from {url}: {e}")
+        return []
+
+
+class ListingCache:
+    """TTL cache of parsed SourceForge listings keyed by folder URL.
+
+    Concurrent requests for a URL that is already being fetched wait for the
+    same task, so a burst of identical /rom calls costs a single scrape.
+    Failed fetches are not cached. ``refresh=True`` skips the fresh entry so a
+    background job can renew it before it expires. With a shared cache, a
+    listing scraped by another worker process is used instead of scraping.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, List[FileInfo]]] = {}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, url: str, refresh: bool = False) -> List[FileInfo]:
+        entry = self._entries.get(url)
+        if not refresh and entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        task = self._in_flight.get(url)
+        if task is None:
+            self.misses += 1
+            task = self._in_flight[url] = asyncio.create_task(self._load(url, refresh))
+        else:
+            self.coalesced += 1
+        # shield: скасування одного запиту не зупиняє завантаження для інших
+        return await asyncio.shield(task)
+
+    def put(self, url: str, files: List[FileInfo]):
+        self._entries[url] = (time.monotonic() + self.ttl, files)
+
+    async def pull(self, url: str) -> Optional[List[FileInfo]]:
+        """Replace the local entry with the shared one, if another process has a fresh listing."""
+        if shared_cache is None:
+            return None
+        entry = await shared_cache.aget(url)
+        if entry is None:
+            return None
+        files = [FileInfo(**item) for item in entry[0]]
+        self._entries[url] = (time.monotonic() + remaining_ttl(entry[1]), files)
+        return files
+
+    async def _load(self, url: str, refresh: bool = False) -> List[FileInfo]:
+        try:
+            if not refresh:
+                files = await self.pull(url)
+                if files is not None:
+                    return files
+            files = await fetch_files_list(url, LISTING_ROWS)
+            self.put(url, files)
+            if shared_cache is not None:
+                await shared_cache.aput(url, [vars(file_info) for file_info in files], self.ttl)
+            return files
+        finally:
+            del self._in_flight[url]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_ratio': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+listing_cache = ListingCache(ttl=float(os.getenv('SOURCEFORGE_CACHE_TTL', '600')))
+CACHE_HIT_RATIO.set_function(lambda: listing_cache.stats()['hit_ratio'], cache='releases')
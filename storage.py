@@ -0,0 +1,135 @@
+import abc
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHANNELS_FILE = 'channels.json'
+CHANNELS_DB = os.getenv('CHANNELS_DB', 'channels.db')
+
+
+def write_json_atomic(path: str, data: Any):
+    """Write ``data`` to a temp file next to ``path`` and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ChannelStore(abc.ABC):
+    """Persistence backend for channel records (dicts keyed by ``channel_id``).
+
+    ``save`` runs in a worker thread and receives both the changed records and
+    a snapshot of all of them, so each backend can choose how much to write.
+    """
+
+    @abc.abstractmethod
+    def load_all(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def save(self, changed: List[Dict[str, Any]], channels: List[Dict[str, Any]]):
+        ...
+
+    def close(self):
+        pass
+
+
+class JsonChannelStore(ChannelStore):
+    """The original flat channels.json list, fine for a handful of groups."""
+
+    def __init__(self, path: str = CHANNELS_FILE):
+        self.path = path
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        return []
+
+    def save(self, changed: List[Dict[str, Any]], channels: List[Dict[str, Any]]):
+        write_json_atomic(self.path, channels)
+
+
+class SqliteChannelStore(ChannelStore):
+    """SQLite backend: one row per channel, upserted individually, WAL journal."""
+
+    def __init__(self, path: str = CHANNELS_DB):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # Запис відбувається з потоку asyncio.to_thread, доступ серіалізує ChannelRegistry
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS channels (channel_id TEXT PRIMARY KEY, data TEXT NOT NULL)'
+            )
+        return self._connection
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        rows = self.connection.execute('SELECT data FROM channels ORDER BY rowid').fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def get(self, channel_id) -> Optional[Dict[str, Any]]:
+        row = self.connection.execute('SELECT data FROM channels WHERE channel_id = ?', (str(channel_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, changed: List[Dict[str, Any]], channels: List[Dict[str, Any]]):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO channels (channel_id, data) VALUES (?, ?) '
+                'ON CONFLICT(channel_id) DO UPDATE SET data = excluded.data',
+                [(channel['channel_id'], json.dumps(channel)) for channel in changed],
+            )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def migrate_json_to_sqlite(json_path: str = CHANNELS_FILE, db_path: str = CHANNELS_DB) -> int:
+    """Copy channels.json into an SQLite store; returns the number of channels imported."""
+    channels = JsonChannelStore(json_path).load_all()
+    store = SqliteChannelStore(db_path)
+    try:
+        store.save(channels, channels)
+    finally:
+        store.close()
+    logger.info(f"Migrated {len(channels)} channels from {json_path} to {db_path}")
+    return len(channels)
+
+
+def create_channel_store() -> ChannelStore:
+    backend = os.getenv('CHANNELS_BACKEND', 'json')
+    if backend == 'json':
+        return JsonChannelStore(os.getenv('CHANNELS_FILE', CHANNELS_FILE))
+    if backend == 'sqlite':
+        json_path = os.getenv('CHANNELS_FILE', CHANNELS_FILE)
+        # Одноразова міграція: нова база заповнюється з існуючого channels.json
+        if not os.path.exists(CHANNELS_DB) and os.path.exists(json_path):
+            migrate_json_to_sqlite(json_path, CHANNELS_DB)
+        return SqliteChannelStore(CHANNELS_DB)
+    raise ValueError(f"Unknown CHANNELS_BACKEND: {backend}")
+
+
+if __name__ == '__main__':
+    # python storage.py [channels.json] [channels.db]
+    logging.basicConfig(level=logging.INFO)
+    migrate_json_to_sqlite(*sys.argv[1:3])
@@ -0,0 +1,303 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import secrets
+import signal
+import sys
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import httpx
+from telegram import Bot, Update
+from telegram.error import NetworkError, RetryAfter
+from telegram.request import HTTPXRequest
+
+from http_server import HttpServer, Request, Response
+from logging_setup import LOG_FILE
+from metrics import METRICS_PORT, Counter, Gauge, metrics_server
+from storage import create_channel_store
+from webhook import SECRET_HEADER, WebhookConfig
+
+logger = logging.getLogger(__name__)
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot_start.py')
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', str(os.cpu_count() or 1)))
+# Звідки супервізор бере оновлення: polling або webhook (налаштування WEBHOOK_*)
+BOT_INGRESS = os.getenv('BOT_INGRESS', 'polling')
+WORKER_BASE_PORT = int(os.getenv('WORKER_BASE_PORT', '18500'))
+SHARED_CACHE_DB = os.getenv('SHARED_CACHE_DB', 'shared_cache.db')
+SHARD_QUEUE_SIZE = int(os.getenv('SHARD_QUEUE_SIZE', '1000'))
+POLL_TIMEOUT = 30
+
+# Оновлення, що належать чату; решта (inline-запити тощо) шардується за користувачем
+CHAT_FIELDS = (
+    'message', 'edited_message', 'channel_post', 'edited_channel_post', 'business_message',
+    'edited_business_message', 'my_chat_member', 'chat_member', 'chat_join_request',
+    'message_reaction', 'message_reaction_count', 'chat_boost', 'removed_chat_boost',
+)
+
+FORWARDED = Counter('bot_supervisor_forwarded_total', "Updates handed to worker processes.", ('shard',))
+RESTARTS = Counter('bot_supervisor_restarts_total', "Worker processes restarted after exiting.", ('shard',))
+BACKLOG = Gauge('bot_supervisor_backlog', "Updates waiting to be forwarded to a worker.", ('shard',))
+
+
+def update_chat_id(data: Dict[str, Any]) -> int:
+    for field in CHAT_FIELDS:
+        if field in data:
+            return data[field]['chat']['id']
+    for value in data.values():
+        if isinstance(value, dict):
+            message = value.get('message')
+            if isinstance(message, dict) and 'chat' in message:
+                return message['chat']['id']
+            user = value.get('from') or value.get('user')
+            if isinstance(user, dict):
+                return user['id']
+    return 0
+
+
+def shard_of(chat_id: int, shards: int) -> int:
+    return zlib.crc32(str(chat_id).encode()) % shards
+
+
+def worker_log_file(index: int) -> str:
+    root, ext = os.path.splitext(LOG_FILE)
+    return f"{root}.worker{index}{ext}"
+
+
+class WorkerProcess:
+    """A ``bot_start.py`` process serving one shard on a local webhook port; restarted when it exits."""
+
+    def __init__(self, index: int, env: Dict[str, str]):
+        self.index = index
+        self.env = env
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+
+    async def run(self, stopping: asyncio.Event):
+        backoff = 1.0
+        while not stopping.is_set():
+            started = time.monotonic()
+            self.process = await asyncio.create_subprocess_exec(sys.executable, BOT_SCRIPT, env=self.env)
+            logger.info(f"Worker {self.index} started with pid {self.process.pid}")
+            code = await self.process.wait()
+            if stopping.is_set():
+                return
+            self.restarts += 1
+            RESTARTS.inc(shard=self.index)
+            # Після тривалої роботи перезапуск одразу; процес, що падає на старті, — з наростаючою паузою
+            if time.monotonic() - started > 60:
+                backoff = 1.0
+            logger.error(f"Worker {self.index} exited with code {code}, restarting in {backoff:.0f}s")
+            try:
+                await asyncio.wait_for(stopping.wait(), backoff)
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, 30.0)
+
+    async def stop(self, timeout: float = 30.0):
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Worker {self.index} did not stop in {timeout:.0f}s, killing it")
+            self.process.kill()
+            await self.process.wait()
+
+
+class Shard:
+    """FIFO of raw updates for one worker, forwarded one at a time so per-chat order holds."""
+
+    def __init__(self, index: int, url: str, secret: str, queue_size: int):
+        self.index = index
+        self.url = url
+        self.headers = {SECRET_HEADER: secret, 'Content-Type': 'application/json'}
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        BACKLOG.set_function(self.queue.qsize, shard=index)
+
+    async def forward(self, client: httpx.AsyncClient):
+        while True:
+            body = await self.queue.get()
+            delay = 0.1
+            while True:
+                try:
+                    response = await client.post(self.url, content=body, headers=self.headers)
+                    if response.status_code == 200:
+                        FORWARDED.inc(shard=self.index)
+                        break
+                    if response.status_code != 503:
+                        logger.error(f"Worker {self.index} rejected an update with {response.status_code}")
+                        break
+                except httpx.TransportError:
+                    # Процес перезапускається або ще не слухає порт
+                    pass
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+            self.queue.task_done()
+
+
+class Supervisor:
+    """Runs ``workers`` bot processes and shards incoming updates between them by chat.
+
+    Workers are ordinary webhook-mode bots listening on 127.0.0.1. They share
+    channel configuration through the SQLite channel store and fetched
+    catalogue/listings through the SQLite shared cache; only worker 0 runs the
+    release watcher.
+    """
+
+    def __init__(self, workers: int = BOT_WORKERS, ingress: str = BOT_INGRESS):
+        self.ingress = ingress
+        self.secret = secrets.token_urlsafe(32)
+        self.shards = [
+            Shard(index, f"http://127.0.0.1:{WORKER_BASE_PORT + index}/telegram", self.secret, SHARD_QUEUE_SIZE)
+            for index in range(workers)
+        ]
+        self.workers = [WorkerProcess(index, self._worker_env(index)) for index in range(workers)]
+        self.webhook_config = WebhookConfig()
+        self.server: Optional[HttpServer] = None
+        self._stopping = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._ingress_task: Optional[asyncio.Task] = None
+        self._offset: Optional[int] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _worker_env(self, index: int) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update(
+            BOT_MODE='webhook',
+            WORKER_INDEX=str(index),
+            WEBHOOK_URL='',
+            WEBHOOK_LISTEN='127.0.0.1',
+            WEBHOOK_PORT=str(WORKER_BASE_PORT + index),
+            WEBHOOK_PATH='/telegram',
+            WEBHOOK_SECRET=self.secret,
+            CHANNELS_BACKEND='sqlite',
+            SHARED_CACHE_DB=SHARED_CACHE_DB,
+            LOG_FILE=worker_log_file(index),
+            METRICS_PORT=str(METRICS_PORT + 1 + index) if METRICS_PORT else '0',
+        )
+        return env
+
+    def _shard(self, data: Dict[str, Any]) -> Shard:
+        return self.shards[shard_of(update_chat_id(data), len(self.shards))]
+
+    async def handle_update(self, request: Request) -> Response:
+        secret_token = self.webhook_config.secret_token
+        if secret_token and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), secret_token):
+            return Response(403)
+        try:
+            data = json.loads(request.body)
+            shard = self._shard(data)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return Response(400)
+        try:
+            shard.queue.put_nowait(request.body)
+        except asyncio.QueueFull:
+            return Response(503, headers={'Retry-After': '1'})
+        return Response(200)
+
+    async def handle_health(self, request: Request) -> Response:
+        return Response.json({
+            'backlog': [shard.queue.qsize() for shard in self.shards],
+            'restarts': [worker.restarts for worker in self.workers],
+        })
+
+    async def poll(self, bot: Bot):
+        while True:
+            try:
+                updates = await bot.get_updates(offset=self._offset, timeout=POLL_TIMEOUT, allowed_updates=Update.ALL_TYPES)
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except NetworkError as e:
+                logger.warning(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                # Черга шарду обмежена: якщо робочий процес не встигає, опитування чекає
+                data = update.to_dict()
+                await self._shard(data).queue.put(json.dumps(data).encode())
+                self._offset = update.update_id + 1
+
+    async def _run_polling(self):
+        bot = Bot(os.getenv('TELEGRAM_TOKEN'), get_updates_request=HTTPXRequest(read_timeout=POLL_TIMEOUT + 10))
+        async with bot:
+            await bot.delete_webhook()
+            try:
+                await self.poll(bot)
+            finally:
+                # Підтверджуємо вже розподілені оновлення, щоб Telegram не надіслав їх знову
+                if self._offset is not None:
+                    await bot.get_updates(offset=self._offset, limit=1, timeout=0)
+
+    async def start(self):
+        if self.ingress == 'webhook':
+            self.webhook_config.validate()
+        # Міграція channels.json → SQLite один раз, до запуску робочих процесів
+        os.environ['CHANNELS_BACKEND'] = 'sqlite'
+        create_channel_store().close()
+
+        self._client = httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_connections=len(self.shards) * 2))
+        for worker in self.workers:
+            self._tasks.append(asyncio.create_task(worker.run(self._stopping)))
+        for shard in self.shards:
+            self._tasks.append(asyncio.create_task(shard.forward(self._client)))
+        if METRICS_PORT:
+            await metrics_server.start()
+
+        if self.ingress == 'webhook':
+            config = self.webhook_config
+            self.server = HttpServer(config.listen, config.port)
+            self.server.route('POST', config.path, self.handle_update)
+            self.server.route('GET', '/healthz', self.handle_health)
+            await self.server.start()
+            if config.url:
+                bot = Bot(os.getenv('TELEGRAM_TOKEN'))
+                async with bot:
+                    await bot.set_webhook(config.url, secret_token=config.secret_token,
+                                          max_connections=config.max_connections, allowed_updates=Update.ALL_TYPES)
+        else:
+            self._ingress_task = asyncio.create_task(self._run_polling())
+        logger.info(f"Supervisor started {len(self.workers)} workers with {self.ingress} ingress")
+
+    async def stop(self, drain_timeout: float = 30.0):
+        # Спочатку зупиняємо прийом, потім передаємо накопичене, і лише тоді зупиняємо процеси
+        if self.server is not None:
+            await self.server.stop()
+        if self._ingress_task is not None:
+            self._ingress_task.cancel()
+            await asyncio.gather(self._ingress_task, return_exceptions=True)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(shard.queue.join() for shard in self.shards)), drain_timeout)
+        except asyncio.TimeoutError:
+            lost = sum(shard.queue.qsize() for shard in self.shards)
+            logger.error(f"Workers did not take {lost} updates in {drain_timeout:.0f}s, dropping them")
+
+        self._stopping.set()
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._client.aclose()
+        await metrics_server.stop()
+        logger.info("Supervisor stopped")
+
+
+async def run_supervisor(stop_event: Optional[asyncio.Event] = None):
+    """Run the supervisor until SIGINT/SIGTERM."""
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    supervisor = Supervisor()
+    await supervisor.start()
+    try:
+        await stop_event.wait()
+    finally:
+        await supervisor.stop()
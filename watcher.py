@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import httpx
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
+
+from catalog import DeviceCatalog, devices_cache
+from channels import channel_registry
+from responses import latest_versions, render_version, rom_pages
+from sourceforge import FileInfo, LISTING_ROWS, listing_cache, parse_files_list, release_url
+from storage import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+RELEASE_STATE_FILE = os.getenv('RELEASE_STATE_FILE', 'release_state.json')
+# Має бути меншим за SOURCEFORGE_CACHE_TTL, щоб /rom завжди відповідав з кешу
+RELEASE_WATCH_INTERVAL = float(os.getenv('RELEASE_WATCH_INTERVAL', '300'))
+RELEASE_WATCH_CONCURRENCY = int(os.getenv('RELEASE_WATCH_CONCURRENCY', '4'))
+
+
+def fixture_path(fixtures_dir: str, device_code: str, version_code: str) -> str:
+    return os.path.join(fixtures_dir, f"{device_code}_{version_code}.html")
+
+
+def announcement(device: Dict[str, Any], version: Dict[str, Any], files_list: List[FileInfo]) -> str:
+    return (
+        f"#{device['codename']} #rom\n"
+        f"<b>New build for {device.get('brand')} | {device.get('name')}</b>\n\n"
+        f"{render_version(version, files_list)}"
+    )
+
+
+class ReleaseWatcher:
+    """Scrapes every device/version once per run and announces new builds.
+
+    The newest file seen for each ``device/version`` is persisted to
+    ``state_path``, so a restart does not announce old builds again; a listing
+    seen for the first time only seeds the state. Every scraped listing is also
+    stored in ``listing_cache`` for /rom.
+
+    With ``fixtures_dir`` set the watcher runs dry: listings are read from
+    ``<device>_<version>.html`` files there and announcements are only logged.
+    """
+
+    def __init__(self, state_path: str = RELEASE_STATE_FILE, fixtures_dir: Optional[str] = None,
+                 concurrency: int = RELEASE_WATCH_CONCURRENCY):
+        self.state_path = state_path
+        self.fixtures_dir = fixtures_dir
+        self.concurrency = concurrency
+        self._state: Optional[Dict[str, Dict[str, str]]] = None
+        self.runs = 0
+        self.announced = 0
+
+    @property
+    def dry_run(self) -> bool:
+        return self.fixtures_dir is not None
+
+    def _load_state(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Corrupted release state in {self.state_path}, starting over: {e}")
+            return {}
+
+    async def _listing(self, device_code: str, version_code: str) -> Optional[List[FileInfo]]:
+        url = release_url(device_code, version_code)
+        if self.dry_run:
+            try:
+                with open(fixture_path(self.fixtures_dir, device_code, version_code), 'rb') as f:
+                    files = parse_files_list(f.read(), LISTING_ROWS)
+            except FileNotFoundError:
+                return None
+            listing_cache.put(url, files)
+            return files
+        try:
+            return await listing_cache.get(url, refresh=True)
+        except httpx.HTTPError as e:
+            logger.error(f"Release check failed for {device_code}/{version_code}: {e}")
+            return None
+
+    async def run(self, bot, catalog: DeviceCatalog) -> List[str]:
+        """Check all releases once; returns the announcements that were made."""
+        if self._state is None:
+            self._state = self._load_state()
+        state = self._state
+        limit = asyncio.Semaphore(self.concurrency)
+        announcements = []
+        changed = False
+
+        async def check(device, version):
+            nonlocal changed
+            version_code = version.get('version_code')
+            async with limit:
+                files_list = await self._listing(device['codename'], version_code)
+            if not files_list:
+                return
+            newest = files_list[0]
+            key = f"{device['codename']}/{version_code}"
+            seen = state.get(key)
+            if seen is not None and (seen['name'], seen['last_updated']) == (newest.name, newest.last_updated):
+                return
+            state[key] = {'name': newest.name, 'last_updated': newest.last_updated}
+            changed = True
+            # Перше спостереження лише запам'ятовується, щоб не оголошувати старі збірки
+            if seen is not None:
+                announcements.append(announcement(device, version, files_list))
+
+        await asyncio.gather(*(
+            check(device, version)
+            for device in catalog.devices
+            for version in device.get('supported_versions', [])
+        ))
+        if changed:
+            await asyncio.to_thread(write_json_atomic, self.state_path, dict(state))
+
+        if announcements and not self.dry_run:
+            # Підписки могли змінити інші робочі процеси
+            await channel_registry.reload()
+        for text in announcements:
+            await self.announce(bot, text)
+        self.runs += 1
+        return announcements
+
+    async def announce(self, bot, text: str):
+        self.announced += 1
+        if self.dry_run:
+            logger.info(f"[dry run] Announcement:\n{text}")
+            return
+        for channel in channel_registry.all():
+            if not channel.get('announce_releases'):
+                continue
+            topic = channel.get('announce_topic')
+            try:
+                await bot.send_message(
+                    chat_id=int(channel['channel_id']),
+                    text=text,
+                    parse_mode='HTML',
+                    message_thread_id=int(topic) if topic not in (None, 'None') else None,
+                )
+            except TelegramError as e:
+                logger.error(f"Failed to announce release in chat {channel['channel_id']}: {e}")
+
+
+release_watcher = ReleaseWatcher(fixtures_dir=os.getenv('RELEASE_WATCH_FIXTURES'))
+
+
+async def watch_releases(context: ContextTypes.DEFAULT_TYPE):
+    """Job callback: check for new builds, then re-render the /rom pages from the fresh listings."""
+    catalog = await devices_cache.get()
+    if not catalog:
+        return
+    announcements = await release_watcher.run(context.bot, catalog)
+    await rom_pages.warm(catalog)
+    logger.info(f"Checked releases of {len(catalog)} devices, {len(announcements)} new builds")
+
+
+async def warm_rom_pages(context: ContextTypes.DEFAULT_TYPE):
+    """Job callback for workers that do not run the watcher: re-render /rom pages from shared listings.
+
+    Devices whose listings are not in the shared cache yet are skipped, so
+    these workers never scrape SourceForge themselves.
+    """
+    catalog = await devices_cache.get()
+    if not catalog:
+        return
+    for device in catalog.devices:
+        listings = [
+            await listing_cache.pull(release_url(device['codename'], version.get('version_code')))
+            for version in latest_versions(device)
+        ]
+        if all(files_list is not None for files_list in listings):
+            rom_pages.render(catalog, device, listings)
+
+
+async def _dry_run(devices_path: str, fixtures_dir: str, state_path: str):
+    with open(devices_path, 'r') as f:
+        catalog = DeviceCatalog(json.load(f))
+    watcher = ReleaseWatcher(state_path, fixtures_dir)
+    announcements = await watcher.run(None, catalog)
+    print(f"{len(announcements)} announcements, state written to {state_path}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Run one release check against local fixture pages.")
+    parser.add_argument('devices', help="path to a devices.json file")
+    parser.add_argument('fixtures', help="directory with <device>_<version>.html listing pages")
+    parser.add_argument('--state', default=RELEASE_STATE_FILE)
+    args = parser.parse_args()
+    asyncio.run(_dry_run(args.devices, args.fixtures, args.state))
@@ -0,0 +1,120 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+from typing import Optional
+
+from telegram import Update
+from telegram.ext import Application
+
+from http_server import HttpServer, Request, Response
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+
+
+class WebhookConfig:
+    def __init__(self):
+        self.url = os.getenv('WEBHOOK_URL')
+        self.listen = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+        self.port = int(os.getenv('WEBHOOK_PORT', '8443'))
+        self.path = os.getenv('WEBHOOK_PATH', '/telegram')
+        self.secret_token = os.getenv('WEBHOOK_SECRET')
+        self.queue_size = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))
+        self.max_connections = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+    def validate(self):
+        # Публічний вебхук без секрету приймав би оновлення від будь-кого
+        if self.url and not self.secret_token:
+            raise ValueError("WEBHOOK_SECRET must be set when WEBHOOK_URL is set")
+
+
+class WebhookServer:
+    """Receives Telegram updates over HTTP and feeds them to the Application.
+
+    ``application.update_queue`` must be bounded: when it is full the request is
+    answered with 503 and Telegram redelivers the update later, so a slow bot
+    pushes back instead of buffering without limit.
+    """
+
+    def __init__(self, application: Application, config: WebhookConfig):
+        self.application = application
+        self.config = config
+        self.server = HttpServer(config.listen, config.port)
+        self.server.route('POST', config.path, self.handle_update)
+        self.server.route('GET', '/healthz', self.handle_health)
+        self.accepted = 0
+        self.rejected = 0
+
+    async def handle_update(self, request: Request) -> Response:
+        if self.config.secret_token and not hmac.compare_digest(
+                request.headers.get(SECRET_HEADER, ''), self.config.secret_token):
+            return Response(403)
+        try:
+            update = Update.de_json(json.loads(request.body), self.application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return Response(400)
+
+        try:
+            self.application.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return Response(503, headers={'Retry-After': '1'})
+        self.accepted += 1
+        return Response(200)
+
+    async def handle_health(self, request: Request) -> Response:
+        return Response.json({
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'queue': self.application.update_queue.qsize(),
+        })
+
+    async def start(self):
+        await self.server.start()
+
+    async def stop(self):
+        await self.server.stop()
+
+
+async def run_webhook(application: Application, config: Optional[WebhookConfig] = None,
+                      stop_event: Optional[asyncio.Event] = None):
+    """Run ``application`` behind our own webhook endpoint until SIGINT/SIGTERM."""
+    config = config or WebhookConfig()
+    config.validate()
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    if config.url:
+        await application.bot.set_webhook(
+            config.url,
+            secret_token=config.secret_token,
+            max_connections=config.max_connections,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    await application.start()
+
+    server = WebhookServer(application, config)
+    await server.start()
+    logger.info("Bot started in webhook mode...")
+    try:
+        await stop_event.wait()
+    finally:
+        # Спочатку перестаємо приймати запити, потім обробляємо вже прийняті оновлення.
+        # Вебхук не видаляємо: під час перезапуску Telegram притримає оновлення.
+        await server.stop()
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+        logger.info("Webhook server stopped")